@@ -0,0 +1,275 @@
+"""
+End-to-end crawl benchmark against a local synthetic web, plus
+micro-benchmarks of the parser, keyword matcher and friends.
+Crawls a generated link graph through the real Crawler/Scraper pipeline
+into a throwaway database and reports pages/sec, p50/p99 fetch and parse
+latency, DB write time and peak RSS. Results can be saved as JSON and
+compared with an earlier run.
+
+    python benchmarks/bench_crawl.py --pages 500 --out before.json
+    python benchmarks/bench_crawl.py --pages 500 --latency 0.02 --compare before.json
+    python benchmarks/bench_crawl.py --micro-only
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic_web import SyntheticWeb, start_server
+from src.crawler import Crawler
+from src.database import DatabaseManager
+from src.fetcher import Fetcher
+from src.scraper import Scraper, KeywordManager, WebParser, analyze_content
+from src.simhash import simhash
+from src.urls import canonicalize
+
+class TimedCrawler(Crawler):
+    """Crawler that records how long each fetch and in-thread parse takes."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fetch_times = []
+        self.parse_times = []
+
+    def _fetch_and_extract(self, url, state):
+        scraper = Scraper(url, db=self.db, keywords_manager=self.keywords_manager, fetcher=self.fetcher,
+                          fetch_state=state)
+        start = time.perf_counter()
+        body = scraper.fetch_html(stream=self.parse_pool is None)
+        # In-thread parsing tokenizes while the body downloads; count that as parse time
+        self.fetch_times.append(time.perf_counter() - start - scraper.parse_seconds)
+
+        page = None
+        if body and self.parse_pool is None:
+            start = time.perf_counter()
+            page = scraper.extract(body)
+            self.parse_times.append(time.perf_counter() - start + scraper.parse_seconds)
+        return scraper, body, page
+
+def timed_method(obj, name, times):
+    """Replaces obj.name with a wrapper that appends each call's duration to times."""
+    method = getattr(obj, name)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            times.append(time.perf_counter() - start)
+    setattr(obj, name, wrapper)
+
+def latency_summary(times):
+    """p50/p99/mean in milliseconds, or None when nothing was measured."""
+    if not times:
+        return None
+    ms = sorted(t * 1000 for t in times)
+    p99 = statistics.quantiles(ms, n=100)[98] if len(ms) > 1 else ms[0]
+    return {'count': len(ms), 'p50_ms': statistics.median(ms), 'p99_ms': p99,
+            'mean_ms': statistics.fmean(ms), 'total_s': sum(ms) / 1000}
+
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 1024
+
+def run_crawl(args):
+    web = SyntheticWeb(args.pages, args.fanout, int(args.page_kb * 1024))
+    server, base = start_server(web, args.latency, args.jitter)
+    tmp = tempfile.mkdtemp(prefix='linksurfer-bench-')
+    db = DatabaseManager(os.path.join(tmp, 'bench.db'))
+    db_times = []
+    timed_method(db, 'add_page', db_times)
+
+    fetcher = Fetcher(concurrency_per_host=args.workers, delay_per_host=0)
+    crawler = TimedCrawler(f"{base}/p/0.html", max_depth=args.pages, max_pages=args.pages, workers=args.workers,
+                           db=db, fetcher=fetcher, commit_every=args.commit_every,
+                           parse_workers=args.parse_workers)
+
+    # The pipeline prints a line per page; keep the report readable
+    stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+    start = time.perf_counter()
+    try:
+        crawler.run()
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    elapsed = time.perf_counter() - start
+
+    db.close()
+    db_size = sum(os.path.getsize(os.path.join(tmp, f)) for f in os.listdir(tmp))
+    server.shutdown()
+    for name in os.listdir(tmp):
+        os.remove(os.path.join(tmp, name))
+    os.rmdir(tmp)
+
+    return {
+        'elapsed_s': elapsed,
+        'pages_per_sec': crawler.indexed / elapsed if elapsed else 0,
+        'stats': crawler.stats(),
+        'fetch': latency_summary(crawler.fetch_times),
+        # Parsing in worker processes isn't timed per page
+        'parse': latency_summary(crawler.parse_times),
+        'db_write': latency_summary(db_times),
+        'db_size_mb': db_size / 2**20,
+        'peak_rss_mb': peak_rss_mb(),
+        'peak_rss_children_mb': peak_rss_mb(resource.RUSAGE_CHILDREN),
+        # The crawler's own per-stage histograms (DNS, connect, wait, transfer, parse, ...)
+        'metrics': crawler.metrics.snapshot(),
+    }
+
+def best_of(fn, repeat):
+    """Fastest of `repeat` runs, in seconds."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def run_micro(args):
+    web = SyntheticWeb(args.micro_pages, args.fanout, int(args.page_kb * 1024), seed=1)
+    bodies = [web.page(i) for i in range(args.micro_pages)]
+    megabytes = sum(len(b) for b in bodies) / 2**20
+    keywords_manager = KeywordManager()
+
+    parsed = [WebParser(body, base_url=f"https://example.com/p/{i}.html") for i, body in enumerate(bodies)]
+    texts = [" ".join(p.extract_paragraphs()) for p in parsed]
+    words = sum(len(t.split()) for t in texts)
+    links = [link for p in parsed for link in p.extract_links()]
+    raw_links = [f"HTTPS://Example.com:443/a/../p/{i}.html?utm_source=x&b=2&a=1#frag" for i in range(len(links))]
+
+    def parse():
+        for i, body in enumerate(bodies):
+            WebParser(body, base_url=f"https://example.com/p/{i}.html")
+
+    def match():
+        for text in texts:
+            keywords_manager.scan(text)
+
+    def analyze():
+        for p in parsed:
+            analyze_content(p.extract_paragraphs(), keywords_manager)
+
+    def fingerprint():
+        for text in texts:
+            simhash(text)
+
+    def canonical():
+        for url in raw_links:
+            canonicalize(url)
+
+    results = {}
+    seconds = best_of(parse, args.repeat)
+    results['parser'] = {'s': seconds, 'mb_per_sec': megabytes / seconds, 'ms_per_page': seconds * 1000 / len(bodies)}
+    seconds = best_of(match, args.repeat)
+    results['keyword_matcher'] = {'s': seconds, 'words_per_sec': words / seconds}
+    seconds = best_of(analyze, args.repeat)
+    results['analyze_content'] = {'s': seconds, 'ms_per_page': seconds * 1000 / len(bodies)}
+    seconds = best_of(fingerprint, args.repeat)
+    results['simhash'] = {'s': seconds, 'ms_per_page': seconds * 1000 / len(bodies)}
+    seconds = best_of(canonical, args.repeat)
+    results['canonicalize'] = {'s': seconds, 'urls_per_sec': len(raw_links) / seconds}
+    return results
+
+def flatten(data, prefix=''):
+    """{'crawl': {'fetch': {'p50_ms': 1}}} -> {'crawl.fetch.p50_ms': 1} for numeric leaves."""
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + '.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+def compare(old, new):
+    old_flat = flatten({'crawl': old.get('crawl') or {}, 'micro': old.get('micro') or {}})
+    new_flat = flatten({'crawl': new.get('crawl') or {}, 'micro': new.get('micro') or {}})
+    print(f"\n{'metric':<40} {'before':>12} {'after':>12} {'change':>8}")
+    for name, after in new_flat.items():
+        before = old_flat.get(name)
+        if before is None:
+            continue
+        change = f"{(after - before) / before * 100:+7.1f}%" if before else '       -'
+        print(f"{name:<40} {before:12.3f} {after:12.3f} {change}")
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_report(result):
+    crawl = result.get('crawl')
+    if crawl:
+        stats = crawl['stats']
+        print(f"Crawl: {stats['indexed']} indexed / {stats['fetched']} fetched in {crawl['elapsed_s']:.2f}s "
+              f"= {crawl['pages_per_sec']:.1f} pages/sec ({stats['errors']} errors)")
+        for stage in ('fetch', 'parse', 'db_write'):
+            summary = crawl[stage]
+            if summary:
+                print(f"  {stage:<9} p50 {summary['p50_ms']:8.2f} ms   p99 {summary['p99_ms']:8.2f} ms   "
+                      f"total {summary['total_s']:7.2f} s")
+        print(f"  DB size {crawl['db_size_mb']:.1f} MB, peak RSS {crawl['peak_rss_mb']:.1f} MB "
+              f"(parse workers {crawl['peak_rss_children_mb']:.1f} MB)")
+
+    micro = result.get('micro')
+    if micro:
+        print("Micro-benchmarks:")
+        print(f"  parser           {micro['parser']['mb_per_sec']:10.2f} MB/s   "
+              f"{micro['parser']['ms_per_page']:8.2f} ms/page")
+        print(f"  keyword matcher  {micro['keyword_matcher']['words_per_sec']:10.0f} words/s")
+        print(f"  analyze_content  {micro['analyze_content']['ms_per_page']:10.2f} ms/page")
+        print(f"  simhash          {micro['simhash']['ms_per_page']:10.2f} ms/page")
+        print(f"  canonicalize     {micro['canonicalize']['urls_per_sec']:10.0f} urls/s")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, default=500, help='Pages in the synthetic site (and crawl budget)')
+    parser.add_argument('--fanout', type=int, default=8, help='Links per page')
+    parser.add_argument('--page-kb', type=float, default=20, help='Approximate page size')
+    parser.add_argument('--latency', type=float, default=0.0, help='Server delay per response, in seconds')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Extra random server delay, up to this')
+    parser.add_argument('--workers', type=int, default=8, help='Fetch threads')
+    parser.add_argument('--parse-workers', type=int, default=0, help='Parse processes (0 parses in-thread)')
+    parser.add_argument('--commit-every', type=int, default=50)
+    parser.add_argument('--micro-pages', type=int, default=50, help='Pages per micro-benchmark')
+    parser.add_argument('--repeat', type=int, default=3, help='Micro-benchmark repetitions (best is kept)')
+    parser.add_argument('--micro-only', action='store_true')
+    parser.add_argument('--skip-micro', action='store_true')
+    parser.add_argument('--out', help='Write results to this JSON file')
+    parser.add_argument('--compare', help='Earlier JSON results to compare against')
+    args = parser.parse_args()
+
+    result = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'git': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'config': vars(args),
+        # Crawl first so peak RSS reflects the crawl, not the micro-benchmarks
+        'crawl': None if args.micro_only else run_crawl(args),
+        'micro': None if args.skip_micro else run_micro(args),
+    }
+    print_report(result)
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"Saved results to {args.out}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), result)
+
+if __name__ == '__main__':
+    main()
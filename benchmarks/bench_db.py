@@ -0,0 +1,85 @@
+"""
+Indexing write-path benchmark.
+Stores synthetic pages the old way (a new connection and commit per
+statement) and through DatabaseManager.add_page, with and without batching,
+and reports pages/sec.
+
+    python benchmarks/bench_db.py --pages 2000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database import DatabaseManager
+from src.setup_db import init_db
+from src.scraper import CATEGORIES
+
+def make_pages(n, keywords_per_page=30):
+    rng = random.Random(0)
+    vocab = [f"keyword{i}" for i in range(2000)]
+    pages = []
+    for i in range(n):
+        keywords = {k: rng.randint(1, 9) for k in rng.sample(vocab, keywords_per_page)}
+        categories = {c: rng.randint(0, 20) for c in CATEGORIES}
+        pages.append((f"https://example.com/{i}", "summary " * 40, "example.com",
+                      "heading", "paragraph " * 50, datetime.now(), keywords, categories))
+    return pages
+
+def store_legacy(db_path, pages):
+    """
+    One connection and one commit per statement, as execute_write used to do.
+    Columns are named: later migrations widened these tables.
+    """
+    def write(query, params):
+        with sqlite3.connect(db_path) as conn:
+            conn.execute(query, params)
+            conn.commit()
+
+    for web_id, (url, summary, owner, heading, paragraph, date, keywords, categories) in enumerate(pages, 1):
+        for k, c in keywords.items():
+            write("INSERT INTO Keywords (keyword, keyword_count, webpage_ID) VALUES (?, ?, ?)", (k, c, web_id))
+        write("INSERT INTO Metadata (url, owner, heading, paragraph, date) VALUES (?, ?, ?, ?, ?)",
+              (url, owner, heading, paragraph, date))
+        write("INSERT INTO webpage (webpage_ID, url, summary) VALUES (?, ?, ?)", (web_id, url, summary))
+        for cat, c in categories.items():
+            write("INSERT INTO Category (category, category_count, webpage_ID) VALUES (?, ?, ?)", (cat, c, web_id))
+
+def store_per_page(db_path, pages):
+    db = DatabaseManager(db_path)
+    for page in pages:
+        db.add_page(*page)
+    db.close()
+
+def store_batched(db_path, pages):
+    db = DatabaseManager(db_path)
+    with db.batch(commit_every=100):
+        for page in pages:
+            db.add_page(*page)
+    db.close()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, default=1000)
+    args = parser.parse_args()
+    pages = make_pages(args.pages)
+
+    for label, fn, count in (('legacy execute_write', store_legacy, min(args.pages, 200)),
+                             ('add_page per commit', store_per_page, args.pages),
+                             ('add_page batched', store_batched, args.pages)):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, 'bench.db')
+            init_db(db_path)
+            start = time.perf_counter()
+            fn(db_path, pages[:count])
+            elapsed = time.perf_counter() - start
+        print(f"{label:<24} {count / elapsed:10.1f} pages/sec ({count} pages)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Fetch-layer benchmark against a local HTTP/1.1 server.
+Compares a fresh urllib connection per page (the old fetch_html path) with
+the pooled keep-alive Fetcher.
+
+    python benchmarks/bench_fetch.py --pages 500
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+import urllib.request as UR
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.fetcher import Fetcher
+
+PAGE = b'<html><body>' + b'<p>Banking and Investment news.</p>' * 200 + b'</body></html>'
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; avoid Nagle stalls
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        body = b'' if self.path == '/robots.txt' else PAGE
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def start_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def fetch_urlopen(url):
+    req = UR.Request(url, headers={'User-Agent': 'Mozilla/5.0'})
+    return UR.urlopen(req).read()
+
+def timed(label, fn, urls, workers):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(fn, urls))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {len(urls) / elapsed:10.1f} pages/sec")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, default=500)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    server = start_server()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    urls = [f"{base}/page{i}.html" for i in range(args.pages)]
+
+    timed('urlopen per request', fetch_urlopen, urls, args.workers)
+
+    fetcher = Fetcher(concurrency_per_host=args.workers, delay_per_host=0)
+    timed('pooled keep-alive Fetcher', fetcher.fetch, urls, args.workers)
+    fetcher.close()
+    server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+Lookup latency at scale, before and after the schema migrations.
+Builds an original-schema (v0) database of N pages, times the GUI's
+lookups against it, migrates it in place and times them again. The
+"summary_page" and "related_pages" rows are the queries behind one GUI
+screen each (two queries per screen in v0, one now); current timings
+are cold, with the read cache cleared before every lookup.
+
+    python benchmarks/bench_lookup.py --pages 100000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database import DatabaseManager
+from src.scraper import CATEGORIES
+from src.setup_db import migrate
+
+LEGACY_QUERIES = {
+    'check_link_exists': ('SELECT webpage_ID FROM webpage WHERE url=?', 'url'),
+    'get_keywords': ('SELECT keyword FROM Keywords WHERE webpage_ID=(SELECT webpage_ID FROM webpage WHERE url=?) '
+                     'ORDER BY keyword_count DESC', 'url'),
+    'get_urls_by_category': ('SELECT w.url FROM webpage w JOIN Category c ON w.webpage_ID = c.webpage_ID '
+                             'WHERE c.category = ? ORDER BY c.category_count DESC LIMIT 5', 'category'),
+    'summary_page': ('SELECT summary FROM webpage WHERE url=?;'
+                     'SELECT keyword FROM Keywords WHERE webpage_ID=(SELECT webpage_ID FROM webpage WHERE url=?) '
+                     'ORDER BY keyword_count DESC', 'url'),
+    # The second query takes the first row of the one before it
+    'related_pages': ('SELECT c.category FROM webpage w JOIN Category c ON c.webpage_ID = w.webpage_ID '
+                      'WHERE w.url = ? ORDER BY c.category_count DESC;'
+                      'SELECT w.url FROM webpage w JOIN Category c ON w.webpage_ID = c.webpage_ID '
+                      'WHERE c.category = ? ORDER BY c.category_count DESC LIMIT 5', 'url'),
+}
+
+def build_legacy_db(path, pages, keywords_per_page):
+    rng = random.Random(0)
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE Metadata (url TEXT, owner TEXT, heading TEXT, paragraph TEXT, date TEXT)')
+    conn.execute('CREATE TABLE webpage (webpage_ID TEXT, url TEXT, summary TEXT)')
+    conn.execute('CREATE TABLE Category (category TEXT, category_count INTEGER, webpage_ID TEXT)')
+    conn.execute('CREATE TABLE Keywords (keyword TEXT, keyword_count INTEGER, webpage_ID TEXT)')
+    for i in range(pages):
+        web_id = str(rng.randint(0, 10**15))
+        url = f"https://example.com/page/{i}"
+        conn.execute('INSERT INTO webpage VALUES (?, ?, ?)', (web_id, url, 'summary'))
+        conn.execute('INSERT INTO Metadata VALUES (?, ?, ?, ?, ?)', (url, 'example.com', 'h', 'p', '2024-01-01'))
+        conn.executemany('INSERT INTO Keywords VALUES (?, ?, ?)',
+                         [(f"kw{rng.randint(0, 2000)}", rng.randint(1, 9), web_id) for _ in range(keywords_per_page)])
+        conn.executemany('INSERT INTO Category VALUES (?, ?, ?)',
+                         [(c, rng.randint(0, 20), web_id) for c in CATEGORIES])
+    conn.commit()
+    conn.close()
+
+def run_legacy(conn, queries, arg, chained=False):
+    # Several ;-separated queries stand for one screen's worth of lookups
+    for query in queries.split(';'):
+        rows = conn.execute(query, (arg,)).fetchall()
+        if chained and rows:
+            arg = rows[0][0]
+
+def time_lookups(fn, args, repeat, before=None):
+    samples = []
+    for arg in args[:repeat]:
+        if before:
+            before()
+        start = time.perf_counter()
+        fn(arg)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, default=100000)
+    parser.add_argument('--keywords', type=int, default=10, help='Keyword rows per page')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    urls = [f"https://example.com/page/{rng.randrange(args.pages)}" for _ in range(args.repeat)]
+    categories = [rng.choice(CATEGORIES) for _ in range(args.repeat)]
+    samples = {'url': urls, 'category': categories}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'lookup.db')
+        print(f"Building v0 database with {args.pages} pages...")
+        build_legacy_db(path, args.pages, args.keywords)
+
+        conn = sqlite3.connect(path)
+        legacy = {}
+        for name, (query, kind) in LEGACY_QUERIES.items():
+            legacy[name] = time_lookups(lambda a: run_legacy(conn, query, a, name == 'related_pages'), samples[kind], args.repeat)
+        conn.close()
+
+        start = time.perf_counter()
+        migrate(path)
+        print(f"Migrated in place in {time.perf_counter() - start:.1f}s")
+
+        db = DatabaseManager(path)
+        cold = db._invalidate
+        current = {
+            'check_link_exists': time_lookups(db.check_link_exists, urls, args.repeat),
+            'get_keywords': time_lookups(db.get_keywords, urls, args.repeat),
+            'get_urls_by_category': time_lookups(lambda c: db.get_urls_by_category(c, limit=5), categories,
+                                                 args.repeat, cold),
+            'summary_page': time_lookups(db.get_page, urls, args.repeat, cold),
+            'related_pages': time_lookups(lambda u: db.get_related_urls(u, limit=5), urls, args.repeat, cold),
+        }
+        db.close()
+
+    print(f"{'lookup':<22} {'v0 ms':>10} {'current ms':>11}")
+    for name in LEGACY_QUERIES:
+        print(f"{name:<22} {legacy[name]:10.3f} {current[name]:11.3f}")
+
+if __name__ == '__main__':
+    main()
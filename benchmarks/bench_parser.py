@@ -0,0 +1,119 @@
+"""
+Parser benchmark over a corpus of saved HTML files.
+Compares the original three-scan WebParser (kept here as LegacyWebParser)
+with the single-pass streaming tokenizer, reporting parse time and peak
+traced memory per page.
+
+    python benchmarks/bench_parser.py --corpus path/to/html_fixtures
+    python benchmarks/bench_parser.py --generate 5 --size-mb 4
+"""
+import argparse
+import glob
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.scraper import WebParser
+
+class LegacyWebParser:
+    """The pre-tokenizer parser: one character-by-character scan per tag."""
+    def __init__(self, html_content):
+        self.html = html_content
+
+    def _extract_tag_content(self, tag_start):
+        results = []
+        j = 0
+        while j < len(self.html):
+            if self.html[j:j+len(tag_start)] == tag_start:
+                tag_close_idx = self.html.find('>', j)
+                if tag_close_idx != -1:
+                    content_start = tag_close_idx + 1
+                    content_end = self.html.find('<', content_start)
+                    if content_end != -1:
+                        clean_text = self.html[content_start:content_end].strip()
+                        if clean_text:
+                            results.append(clean_text)
+                        j = content_end
+            j += 1
+        return results
+
+    def extract_links(self):
+        links = []
+        j = 0
+        while j < len(self.html):
+            if self.html[j:j+4] == 'href':
+                start_quote = self.html.find('"', j)
+                if start_quote != -1:
+                    end_quote = self.html.find('"', start_quote + 1)
+                    if end_quote != -1:
+                        link = self.html[start_quote+1:end_quote]
+                        if link.startswith('http'):
+                            links.append(link)
+            j += 1
+        return links
+
+def parse_legacy(body):
+    # The old fetch_html handed the parser the repr of the raw bytes
+    parser = LegacyWebParser(str(body))
+    parser._extract_tag_content('<p')
+    parser._extract_tag_content('<h')
+    parser.extract_links()
+
+def parse_streaming(body, chunk_size=64 * 1024):
+    parser = WebParser()
+    for i in range(0, len(body), chunk_size):
+        parser.feed(body[i:i + chunk_size])
+    parser.close()
+
+def generate_page(size_bytes, seed):
+    rng = random.Random(seed)
+    words = ['Banking', 'market', 'health', 'the', 'science', 'of', 'football', 'café', 'report']
+    parts = ['<!doctype html><html><head><meta charset="utf-8"><title>Fixture</title>',
+             '<script>var x = "<p>not text</p>";</script></head><body>']
+    size = 0
+    while size < size_bytes:
+        text = ' '.join(rng.choice(words) for _ in range(rng.randint(20, 80)))
+        block = (f'<div class="story"><h2>Story {size}</h2><p>{text} &amp; more</p>'
+                 f'<a href="https://example.com/{rng.randint(0, 10**6)}">read</a></div>\n')
+        parts.append(block)
+        size += len(block)
+    parts.append('</body></html>')
+    return ''.join(parts).encode('utf-8')
+
+def measure(fn, body):
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn(body)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--corpus', help='Directory of saved .html files')
+    parser.add_argument('--generate', type=int, default=3, help='Pages to generate when no corpus is given')
+    parser.add_argument('--size-mb', type=float, default=2.0)
+    args = parser.parse_args()
+
+    if args.corpus:
+        pages = []
+        for path in sorted(glob.glob(os.path.join(args.corpus, '*.htm*'))):
+            with open(path, 'rb') as f:
+                pages.append((os.path.basename(path), f.read()))
+    else:
+        pages = [(f'generated-{i}', generate_page(int(args.size_mb * 2**20), i)) for i in range(args.generate)]
+
+    print(f"{'page':<20} {'MB':>6} {'legacy s':>9} {'stream s':>9} {'legacy MB':>10} {'stream MB':>10}")
+    for name, body in pages:
+        old_time, old_peak = measure(parse_legacy, body)
+        new_time, new_peak = measure(parse_streaming, body)
+        print(f"{name:<20} {len(body) / 2**20:6.2f} {old_time:9.3f} {new_time:9.3f} "
+              f"{old_peak / 2**20:10.1f} {new_peak / 2**20:10.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Parse + analyze throughput of the multi-process pipeline stage.
+Runs the same generated corpus through extract_page in this process and
+through ParsePool with an increasing number of worker processes, and
+reports pages/sec for each.
+
+    python benchmarks/bench_pipeline.py --pages 400 --size-kb 64
+    python benchmarks/bench_pipeline.py --processes 1 2 4 8
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_parser import generate_page
+from src.pipeline import ParsePool
+from src.scraper import KeywordManager, extract_page
+
+def run_inline(corpus):
+    keywords_manager = KeywordManager()
+    for url, body in corpus:
+        extract_page(url, body, None, keywords_manager)
+
+def run_pool(corpus, processes):
+    with ParsePool(processes) as pool:
+        # Warm the workers up so spawn and keyword loading are not timed
+        list(pool.imap((f'warmup-{i}', corpus[0][1], None) for i in range(processes)))
+        start = time.perf_counter()
+        for _ in pool.imap((url, body, None) for url, body in corpus):
+            pass
+        return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--size-kb', type=int, default=64)
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 2, 4])
+    args = parser.parse_args()
+
+    corpus = [(f'https://example.com/{i}', generate_page(args.size_kb * 1024, i)) for i in range(args.pages)]
+    megabytes = sum(len(body) for _, body in corpus) / 2**20
+    print(f"{args.pages} pages, {megabytes:.1f} MB, {os.cpu_count()} CPUs")
+
+    start = time.perf_counter()
+    run_inline(corpus)
+    inline = time.perf_counter() - start
+    print(f"{'inline':<12} {inline:7.2f}s {args.pages / inline:8.1f} pages/s")
+
+    for processes in args.processes:
+        elapsed = run_pool(corpus, processes)
+        print(f"{f'{processes} procs':<12} {elapsed:7.2f}s {args.pages / elapsed:8.1f} pages/s "
+              f"x{inline / elapsed:.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Re-categorization benchmark: fills a database with synthetic pages and
+keyword counts drawn from data/keywords.json, then times
+src/recategorize.py re-scoring every page after the dictionary moves a
+share of its keywords to other categories.
+
+    python benchmarks/bench_recategorize.py --pages 100000 --keywords 20
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic_web import load_keywords
+from src.database import DatabaseManager
+from src.scraper import KeywordManager, KEYWORDS_PATH
+from src import recategorize
+
+def build_index(db, keywords_manager, pages, per_page, seed=0):
+    rng = random.Random(seed)
+    vocabulary = load_keywords()
+    with db.batch():
+        db.execute_many('INSERT INTO webpage (url, summary) VALUES (?, ?)',
+                        [(f"https://example.com/p/{i}", '') for i in range(pages)])
+        rows = []
+        for web_id in range(1, pages + 1):
+            for keyword in rng.sample(vocabulary, per_page):
+                rows.append((keyword, rng.randint(1, 9), web_id))
+        db.execute_many('INSERT INTO Keywords (keyword, keyword_count, webpage_ID) VALUES (?, ?, ?)', rows)
+    # Categories as the crawler would have stored them
+    recategorize.recategorize(db, keywords_manager)
+    return len(rows)
+
+def edited_dictionary(path, share, seed=0):
+    """A copy of keywords.json with `share` of its keywords moved to another category."""
+    rng = random.Random(seed)
+    with open(KEYWORDS_PATH, 'r', encoding='utf-8') as f:
+        word_dict = json.load(f)
+    categories = sorted(set(word_dict.values()))
+    for keyword in word_dict:
+        if rng.random() < share:
+            word_dict[keyword] = rng.choice(categories)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(word_dict, f)
+    return KeywordManager(path)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, default=100000)
+    parser.add_argument('--keywords', type=int, default=20, help='Distinct keywords per page')
+    parser.add_argument('--share', type=float, default=0.1, help='Share of keywords moved to another category')
+    parser.add_argument('--python', action='store_true', help='Force the pure-Python fallback')
+    args = parser.parse_args()
+    if args.python:
+        recategorize.np = None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, 'categories.db'))
+        start = time.perf_counter()
+        rows = build_index(db, KeywordManager(), args.pages, args.keywords)
+        print(f"Built {args.pages} pages x {args.keywords} keywords ({rows} rows) in "
+              f"{time.perf_counter() - start:.1f}s ({'numpy' if recategorize.np is not None else 'pure Python'})")
+
+        keywords_manager = edited_dictionary(os.path.join(tmp, 'keywords.json'), args.share)
+        start = time.perf_counter()
+        recategorize.recategorize(db, keywords_manager)
+        print(f"recategorize: {time.perf_counter() - start:.2f}s total")
+        start = time.perf_counter()
+        recategorize.recategorize(db, keywords_manager)
+        print(f"recategorize again (nothing changed): {time.perf_counter() - start:.2f}s total")
+        db.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Keyword search latency over a synthetic index.
+Indexes N generated pages through DatabaseManager.add_page and times
+single-word, multi-word, phrase and prefix queries (top 10, first and
+fifth result page), by BM25 alone and blended with link authority. The
+read cache is cleared before every query, so timings are cold.
+
+    python benchmarks/bench_search.py --pages 100000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database import DatabaseManager
+from src.search import SearchEngine
+
+QUERIES = ['market', 'the', 'health policy', '"interest rates"', 'scien*', 'football "world cup" final']
+
+def make_vocab(rng, size=20000):
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    vocab = [''.join(rng.choice(letters) for _ in range(rng.randint(4, 10))) for _ in range(size)]
+    # Query words sit in the mid-frequency band, as content words do in real
+    # text; the top ranks play the part of stopwords
+    topical = ['market', 'health', 'policy', 'interest', 'rates', 'science', 'scientist',
+               'football', 'world', 'cup', 'final', 'government', 'election']
+    for i, word in enumerate(topical):
+        vocab[100 + i * 40] = word
+    return vocab
+
+def build_index(db, pages, words_per_page):
+    rng = random.Random(0)
+    vocab = make_vocab(rng)
+    # Zipf-like: a handful of words appear on most pages
+    weights = [1.0 / (i + 1) for i in range(len(vocab))]
+    with db.batch(commit_every=1000):
+        for i in range(pages):
+            words = rng.choices(vocab, weights, k=words_per_page)
+            words[0] = 'the'  # a term on every page: the worst case
+            if i % 7 == 0:
+                words[10:12] = ['interest', 'rates']
+            body = ' '.join(words)
+            db.add_page(f"https://example.com/{i}", body[:200], 'example.com', '', '', datetime.now(),
+                        {}, {}, headings_text=' '.join(words[:8]), body_text=body)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, default=100000)
+    parser.add_argument('--words', type=int, default=300)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, 'search.db'))
+        start = time.perf_counter()
+        build_index(db, args.pages, args.words)
+        print(f"Indexed {args.pages} pages in {time.perf_counter() - start:.1f}s")
+
+        engine = SearchEngine(db)
+        weight = db.AUTHORITY_WEIGHT
+        print(f"{'query':<30} {'page 1 ms':>10} {'page 5 ms':>10} {'blended 1':>10} {'blended 5':>10}")
+        for query in QUERIES:
+            row = []
+            for blend in (0, weight):
+                db.AUTHORITY_WEIGHT = blend
+                for page in (1, 5):
+                    samples = []
+                    for _ in range(args.repeat):
+                        db._invalidate()
+                        t = time.perf_counter()
+                        engine.search(query, page=page, per_page=10)
+                        samples.append((time.perf_counter() - t) * 1000)
+                    row.append(statistics.median(samples))
+            print(f"{query:<30} " + " ".join(f"{ms:10.2f}" for ms in row))
+        db.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+A local HTTP/1.1 server serving a generated link graph, for benchmarks.
+Page i lives at /p/i.html and links to `fanout` other pages (absolute,
+relative and ?utm_ variants, like real sites). Its text mixes filler
+words with entries from data/keywords.json so the matcher has work to
+do. Pages are generated deterministically from their number on request;
+latency adds a fixed delay (plus up to `jitter`) before every response.
+
+    python benchmarks/synthetic_web.py --pages 1000 --fanout 8 --latency 0.02
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.scraper import KEYWORDS_PATH
+
+FILLER = ['the', 'of', 'and', 'report', 'today', 'people', 'said', 'new', 'year', 'government',
+          'world', 'first', 'local', 'after', 'week', 'plans', 'could', 'more', 'than', 'over']
+
+def load_keywords(path=KEYWORDS_PATH):
+    with open(path, 'r', encoding='utf-8') as f:
+        return sorted(json.load(f))
+
+class SyntheticWeb:
+    """Deterministic page generator: the same (pages, fanout, page_size, seed) gives the same site."""
+    def __init__(self, pages=1000, fanout=8, page_size=20 * 1024, seed=0, keywords=None):
+        self.pages = pages
+        self.fanout = fanout
+        self.page_size = page_size
+        self.seed = seed
+        self.keywords = keywords if keywords is not None else load_keywords()
+
+    def links(self, i):
+        rng = random.Random(self.seed * 1_000_003 + i)
+        # Always link to the next page so every page is reachable from p/0
+        targets = [(i + 1) % self.pages] + [rng.randrange(self.pages) for _ in range(self.fanout - 1)]
+        return targets
+
+    def page(self, i):
+        rng = random.Random(self.seed * 1_000_003 + i)
+        parts = [f'<!doctype html><html><head><meta charset="utf-8"><title>Page {i}</title>'
+                 f'<script>var page = {i};</script></head><body><h1>Page {i}</h1>']
+        for n, target in enumerate(self.links(i)):
+            if n % 3 == 0:
+                href = f'/p/{target}.html'
+            elif n % 3 == 1:
+                href = f'{target}.html?utm_source=bench#s{n}'
+            else:
+                href = f'./{target}.html'
+            parts.append(f'<a href="{href}">link {target}</a>')
+
+        size = sum(len(p) for p in parts)
+        while size < self.page_size:
+            words = [rng.choice(self.keywords) if rng.random() < 0.1 else rng.choice(FILLER)
+                     for _ in range(rng.randint(30, 90))]
+            block = f'<h2>Story {size}</h2><p>{" ".join(words)} &amp; more.</p>\n'
+            parts.append(block)
+            size += len(block)
+        parts.append('</body></html>')
+        return ''.join(parts).encode('utf-8')
+
+class SyntheticHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; avoid Nagle stalls
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        server = self.server
+        if server.latency or server.jitter:
+            time.sleep(server.latency + random.random() * server.jitter)
+
+        status, body = 200, b''
+        path = self.path.split('?', 1)[0]
+        if path.startswith('/p/') and path.endswith('.html'):
+            try:
+                i = int(path[3:-5])
+            except ValueError:
+                i = -1
+            if 0 <= i < server.web.pages:
+                body = server.web.page(i)
+            else:
+                status = 404
+        elif path != '/robots.txt':
+            status = 404
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def start_server(web, latency=0.0, jitter=0.0, port=0):
+    """Serves web on 127.0.0.1 from a daemon thread; returns (server, base_url)."""
+    server = ThreadingHTTPServer(('127.0.0.1', port), SyntheticHandler)
+    server.daemon_threads = True
+    server.web = web
+    server.latency = latency
+    server.jitter = jitter
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, default=1000)
+    parser.add_argument('--fanout', type=int, default=8)
+    parser.add_argument('--page-kb', type=float, default=20)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Extra random delay, up to this many seconds')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    web = SyntheticWeb(args.pages, args.fanout, int(args.page_kb * 1024))
+    server, base = start_server(web, args.latency, args.jitter, args.port)
+    print(f"Serving {args.pages} pages at {base}/p/0.html (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
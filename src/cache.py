@@ -0,0 +1,188 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from src.fetcher import Response
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.path.join(BASE_DIR, 'data', 'cache')
+
+class ResponseCache:
+    """
+    Persistent on-disk cache of fetched pages.
+    Bodies are zlib-compressed and stored once per SHA-1 of their content
+    (objects/ab/cdef...), so identical pages share a file. A small SQLite
+    index maps each URL to its body, status and headers, and to the URL the
+    body was finally served from when the request was redirected. Entries older than
+    ttl seconds count as stale, and the least recently used entries are
+    evicted once the compressed bodies exceed max_bytes.
+    """
+    # Share of max_bytes an eviction pass frees the cache down to
+    EVICT_TO = 0.9
+
+    def __init__(self, path=CACHE_DIR, max_bytes=512 * 2**20, ttl=7 * 24 * 3600):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        os.makedirs(os.path.join(path, 'objects'), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(path, 'index.db'), check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('''CREATE TABLE IF NOT EXISTS entries
+                              (url TEXT PRIMARY KEY, digest TEXT NOT NULL, status INTEGER,
+                               headers TEXT, fetched_at REAL, last_access REAL)''')
+        self._conn.execute('''CREATE TABLE IF NOT EXISTS blobs
+                              (digest TEXT PRIMARY KEY, size INTEGER, refcount INTEGER)''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_entries_access ON entries (last_access)')
+        # Final URL after redirects, NULL when it is the URL itself (added later; older caches lack it)
+        columns = [row[1] for row in self._conn.execute('PRAGMA table_info(entries)')]
+        if 'location' not in columns:
+            self._conn.execute('ALTER TABLE entries ADD COLUMN location TEXT')
+        self._conn.commit()
+        # Running size of the stored bodies, so put() only scans the index when over max_bytes
+        self._total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM blobs').fetchone()[0]
+
+    def _blob_path(self, digest):
+        return os.path.join(self.path, 'objects', digest[:2], digest[2:])
+
+    def _read_blob(self, digest):
+        with open(self._blob_path(digest), 'rb') as f:
+            return zlib.decompress(f.read())
+
+    def _write_blob(self, digest, data):
+        """
+        Writes a compressed body unless it is already stored; returns its size
+        on disk. Call with _lock held, so the blob can't be released meanwhile.
+        """
+        path = self._blob_path(digest)
+        if os.path.exists(path):
+            return os.path.getsize(path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+        return len(data)
+
+    def _release_blob(self, digest):
+        """Drops one reference to a blob, deleting it with the last one. Call with _lock held."""
+        self._conn.execute('UPDATE blobs SET refcount = refcount - 1 WHERE digest=?', (digest,))
+        row = self._conn.execute('SELECT refcount, size FROM blobs WHERE digest=?', (digest,)).fetchone()
+        if row and row[0] <= 0:
+            self._conn.execute('DELETE FROM blobs WHERE digest=?', (digest,))
+            self._total -= row[1]
+            try:
+                os.remove(self._blob_path(digest))
+            except OSError:
+                pass
+
+    def _to_response(self, url, digest, status, headers, location):
+        try:
+            body = self._read_blob(digest)
+        except (OSError, zlib.error):
+            return None
+        return Response(location or url, status, json.loads(headers), body)
+
+    # --- Public API ---
+
+    def get(self, url, allow_stale=False, touch=True):
+        """
+        Returns the cached Response for a URL, or None if missing or expired.
+        Its url is the one the body was served from, after any redirects.
+        """
+        with self._lock:
+            row = self._conn.execute('SELECT digest, status, headers, fetched_at, location FROM entries WHERE url=?',
+                                     (url,)).fetchone()
+            if not row:
+                return None
+            digest, status, headers, fetched_at, location = row
+            if not allow_stale and time.time() - fetched_at > self.ttl:
+                return None
+            if touch:
+                self._conn.execute('UPDATE entries SET last_access=? WHERE url=?', (time.time(), url))
+                self._conn.commit()
+            return self._to_response(url, digest, status, headers, location)
+
+    def put(self, response, url=None):
+        """
+        Stores a successful response under url (the requested URL, by default
+        response.url), replacing any earlier copy of it.
+        """
+        url = url or response.url
+        location = response.url if response.url != url else None
+        digest = hashlib.sha1(response.body).hexdigest()
+        # Compress outside the lock; the file check, write and refcount happen under it
+        data = zlib.compress(response.body, 6)
+        now = time.time()
+
+        with self._lock:
+            size = self._write_blob(digest, data)
+            if not self._conn.execute('SELECT 1 FROM blobs WHERE digest=?', (digest,)).fetchone():
+                self._total += size
+            old = self._conn.execute('SELECT digest FROM entries WHERE url=?', (url,)).fetchone()
+            self._conn.execute('''INSERT INTO blobs (digest, size, refcount) VALUES (?, ?, 1)
+                                  ON CONFLICT(digest) DO UPDATE SET refcount = refcount + 1''', (digest, size))
+            self._conn.execute('''INSERT OR REPLACE INTO entries
+                                  (url, digest, status, headers, fetched_at, last_access, location)
+                                  VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                               (url, digest, response.status, json.dumps(response.headers), now, now, location))
+            if old:
+                self._release_blob(old[0])
+            self._evict()
+            self._conn.commit()
+
+    def touch(self, url):
+        """Marks an entry fresh again, e.g. after the server answered 304."""
+        with self._lock:
+            now = time.time()
+            self._conn.execute('UPDATE entries SET fetched_at=?, last_access=? WHERE url=?', (now, now, url))
+            self._conn.commit()
+
+    def _evict(self):
+        """
+        Once the bodies outgrow max_bytes, drops least recently used entries
+        until they fit in EVICT_TO of it, so a full cache isn't scanned on
+        every put. Call with _lock held.
+        """
+        if self._total <= self.max_bytes:
+            return
+        # Another process may share the directory: start from the real total
+        self._total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM blobs').fetchone()[0]
+        target = self.max_bytes * self.EVICT_TO
+        while self._total > target:
+            rows = self._conn.execute('SELECT url, digest FROM entries ORDER BY last_access LIMIT 64').fetchall()
+            if not rows:
+                break
+            for url, digest in rows:
+                if self._total <= target:
+                    break
+                self._conn.execute('DELETE FROM entries WHERE url=?', (url,))
+                self._release_blob(digest)
+
+    def urls(self):
+        with self._lock:
+            return [r[0] for r in self._conn.execute('SELECT url FROM entries ORDER BY url')]
+
+    def items(self):
+        """Yields (requested URL, Response) for every cached entry (stale ones included), one at a time."""
+        for url in self.urls():
+            response = self.get(url, allow_stale=True, touch=False)
+            if response is not None:
+                yield url, response
+
+    def __iter__(self):
+        """Yields every cached Response (stale ones included), one at a time."""
+        for _, response in self.items():
+            yield response
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,206 @@
+"""
+Headless command line for servers and cron: crawl, search, stats and
+export without loading the GUI.
+
+    python src/main.py crawl https://www.bbc.co.uk --depth 2 --max-pages 500
+    python src/main.py crawl --seeds seeds.txt --resume
+    python src/main.py crawl --refresh --max-pages 200
+    python src/main.py search "interest rates" --page 2
+    python src/main.py stats
+    python src/main.py rank
+    python src/main.py recategorize --rescan
+    python src/main.py export --category Finance --format jsonl -o finance.jsonl
+"""
+import argparse
+import os
+import signal
+import sys
+import threading
+
+# Allow running as a script: python src/cli.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database import DatabaseManager
+
+def read_lines(path):
+    """Non-empty, non-comment lines of a file ('-' reads stdin)."""
+    f = sys.stdin if path == '-' else open(path, encoding='utf-8')
+    try:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+def cmd_crawl(args, db):
+    # The crawl stack (fetcher, parse pool, keyword matcher) is only needed here
+    from src.cache import ResponseCache
+    from src.crawler import Crawler
+
+    seeds = list(args.urls)
+    if args.seeds:
+        seeds += read_lines(args.seeds)
+    if not seeds and args.refresh and args.resume is None:
+        # A refresh without seeds revisits the least recently fetched pages
+        seeds = db.get_stale_urls(limit=args.max_pages)
+    if not seeds and args.resume is None:
+        print("Nothing to crawl: give seed URLs, --seeds FILE, --refresh or --resume.")
+        return 2
+
+    # Ctrl+C stops between pages and checkpoints; a second one exits at once
+    cancel = threading.Event()
+    def stop(signum, frame):
+        print("Stopping after the pages in flight (Ctrl+C again to quit now)...")
+        cancel.set()
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+    signal.signal(signal.SIGINT, stop)
+
+    options = dict(db=db, workers=args.workers, parse_workers=args.parse_workers, commit_every=args.commit_every,
+                   cache=ResponseCache() if args.cache else None, resumable=True, cancel_event=cancel,
+                   metrics_path=args.metrics)
+    if args.resume is not None:
+        crawler = Crawler.resume(args.resume or None, **options)
+        if crawler is None:
+            print("No unfinished crawl to resume.")
+            return 1
+    else:
+        crawler = Crawler(seeds, max_depth=args.depth, max_pages=args.max_pages, refresh=args.refresh, **options)
+    crawler.run()
+    stats = crawler.stats()
+    if args.rank and stats['indexed'] and not cancel.is_set():
+        from src.linkrank import rank_pages
+        rank_pages(db)
+    return 1 if stats['errors'] and not stats['indexed'] else 0
+
+def cmd_rank(args, db):
+    from src.linkrank import rank_pages
+    rank_pages(db, damping=args.damping)
+    return 0
+
+def cmd_recategorize(args, db):
+    from src.recategorize import recategorize
+    recategorize(db, rescan=args.rescan)
+    return 0
+
+def cmd_search(args, db):
+    if "://" in args.query:
+        # Same as the GUI: a URL lists the top pages in its primary category
+        from src.urls import canonicalize
+        url = canonicalize(args.query) or args.query
+        url = db.get_duplicate_of(url) or url
+        rows = db.get_related_urls(url, limit=args.per_page)
+        if not rows:
+            print(f"{url} is not indexed.")
+            return 1
+        for (related,) in rows:
+            print(related)
+        return 0
+
+    from src.search import SearchEngine
+    results = SearchEngine(db).search(args.query, page=args.page, per_page=args.per_page)
+    if not results:
+        print("No matching pages found.")
+        return 1
+    for url, summary, score in results:
+        print(f"{score:8.3g}  {url}\n          {summary}")
+    return 0
+
+def cmd_stats(args, db):
+    stats = db.get_index_stats()
+    print(f"Pages indexed:   {stats['pages']}")
+    print(f"Near-duplicates: {stats['duplicates']}")
+    print(f"Stored text:     {stats['text_bytes'] / 2**20:.1f} MB compressed")
+    print(f"Last fetch:      {stats['last_fetched'] or '-'}")
+    if stats['categories']:
+        print("Pages by primary category:")
+        for category, count in stats['categories'].items():
+            print(f"  {category:<14} {count}")
+
+    job = db.get_crawl_job()
+    if job:
+        print(f"Unfinished crawl {job['job_ID']} ({job['status']}): {job['fetched']} fetched, "
+              f"{job['indexed']} indexed of max {job['max_pages']} - resume with: crawl --resume {job['job_ID']}")
+    return 0
+
+def cmd_export(args, db):
+    from src.export import export_pages
+
+    urls = list(args.urls)
+    if args.urls_file:
+        urls += read_lines(args.urls_file)
+    # No URLs means everything (or one category)
+    urls = urls or None
+
+    out = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    try:
+        written = export_pages(db, out, urls=urls, category=args.category, fmt=args.format)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"Exported {written} pages.", file=sys.stderr)
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='linksurfer', description="LinkSurfer without the GUI.")
+    parser.add_argument('--db', default='linksurfer.db', help="Database file name in data/, or a path")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    crawl = commands.add_parser('crawl', help="Crawl from seed URLs into the index")
+    crawl.add_argument('urls', nargs='*', help="Seed URLs")
+    crawl.add_argument('--seeds', help="File of seed URLs, one per line ('-' for stdin)")
+    crawl.add_argument('--depth', type=int, default=1, help="Link depth to follow from the seeds")
+    crawl.add_argument('--max-pages', type=int, default=100, help="Page budget")
+    crawl.add_argument('--workers', type=int, default=8, help="Fetch threads")
+    crawl.add_argument('--parse-workers', type=int, default=max(1, (os.cpu_count() or 2) - 1),
+                       help="Parse processes (0 parses on the fetch threads)")
+    crawl.add_argument('--commit-every', type=int, default=50, help="Pages per DB commit")
+    crawl.add_argument('--refresh', action='store_true', help="Re-fetch pages that are already indexed (with no seeds: the least recently fetched ones)")
+    crawl.add_argument('--cache', action='store_true', help="Keep responses in the on-disk cache")
+    crawl.add_argument('--resume', nargs='?', type=int, const=0, metavar='JOB',
+                       help="Resume an unfinished crawl (the latest one without JOB)")
+    crawl.add_argument('--metrics', help="Write crawl metrics here (.prom or JSON lines)")
+    crawl.add_argument('--no-rank', dest='rank', action='store_false',
+                       help="Skip recomputing link authority after the crawl")
+    crawl.set_defaults(run=cmd_crawl)
+
+    rank = commands.add_parser('rank', help="Recompute PageRank authority from the stored link graph")
+    rank.add_argument('--damping', type=float, default=0.85)
+    rank.set_defaults(run=cmd_rank)
+
+    recategorize = commands.add_parser('recategorize',
+                                       help="Re-score every page's categories after keywords.json changes")
+    recategorize.add_argument('--rescan', action='store_true',
+                              help="Re-match keywords in the stored text too (picks up new keywords)")
+    recategorize.set_defaults(run=cmd_recategorize)
+
+    search = commands.add_parser('search', help="Keyword search, or related pages for a URL")
+    search.add_argument('query')
+    search.add_argument('--page', type=int, default=1)
+    search.add_argument('--per-page', type=int, default=10)
+    search.set_defaults(run=cmd_search)
+
+    stats = commands.add_parser('stats', help="Index size, categories and unfinished crawls")
+    stats.set_defaults(run=cmd_stats)
+
+    export = commands.add_parser('export', help="Write summaries and full text for many pages")
+    export.add_argument('urls', nargs='*', help="URLs to export (default: every indexed page)")
+    export.add_argument('--urls-file', help="File of URLs, one per line ('-' for stdin)")
+    export.add_argument('--category', help="Only pages with this primary category")
+    export.add_argument('--format', choices=('text', 'jsonl'), default='text')
+    export.add_argument('-o', '--output', default='-', help="Output file (default: stdout)")
+    export.set_defaults(run=cmd_export)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    db = DatabaseManager(args.db)
+    try:
+        return args.run(args, db)
+    except BrokenPipeError:
+        # Output piped into head or similar, which stopped reading
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
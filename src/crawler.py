@@ -0,0 +1,418 @@
+import time
+from collections import deque
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlsplit
+from src.database import DatabaseManager
+from src.fetcher import Fetcher
+from src.metrics import Metrics, MetricsExporter
+from src.pipeline import ParsePool
+from src.scraper import Scraper, KeywordManager
+from src.simhash import SimHashIndex
+from src.urls import canonicalize, url_key
+
+class Crawler:
+    """
+    Frontier-based crawl engine.
+    URLs are visited breadth-first from the seeds. Fetching and parsing run on
+    a bounded pool of worker threads, while DB reads and writes stay on the
+    calling thread so SQLite only ever sees a single writer.
+    A resumable crawl also keeps its frontier, counters and per-host timing
+    in the DB, committed alongside the pages, so Crawler.resume() can carry
+    on after the app is closed or crashes.
+    URLs are canonicalized before they enter the frontier, and pages whose
+    text is a near-duplicate (SimHash) of an indexed page are recorded as
+    duplicates instead of being stored or followed.
+    Every stage is timed into self.metrics, which can be written to a
+    JSON-lines or Prometheus file every metrics_interval seconds.
+    """
+    # How far into the frontier to look for a URL on an idle host
+    SCAN_LIMIT = 256
+
+    def __init__(self, seeds, max_depth=1, max_pages=100, workers=8, db=None, keywords_manager=None,
+                 fetcher=None, commit_every=50, progress=None, cancel_event=None, pause_event=None,
+                 refresh=False, cache=None, parse_workers=0, resumable=False, max_retries=2,
+                 dedup_distance=3, metrics=None, metrics_path=None, metrics_interval=10):
+        self.seeds = [seeds] if isinstance(seeds, str) else list(seeds)
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.workers = workers
+        self.db = db or DatabaseManager()
+        self.keywords_manager = keywords_manager or KeywordManager()
+        self.fetcher = fetcher or Fetcher(cache=cache)
+        # Stage latencies, counters and queue depths, shared with the fetcher and DB
+        self.metrics = metrics or self.fetcher.metrics or Metrics()
+        if self.fetcher.metrics is None:
+            self.fetcher.use_metrics(self.metrics)
+        self.metrics_path = metrics_path
+        self.metrics_interval = metrics_interval
+        # Pages per DB commit during the crawl
+        self.commit_every = commit_every
+        # Re-fetch already indexed pages with conditional requests instead of skipping them
+        self.refresh = refresh
+        # Worker processes for parse + analyze; 0 parses on the fetch threads
+        self.parse_workers = parse_workers
+        self.parse_pool = None
+        # Failed fetches are re-queued this many times before giving up
+        self.max_retries = max_retries
+        # Persist the frontier under a crawl_job row (created in run())
+        self.resumable = resumable
+        self.job_id = None
+        # Max SimHash bit difference for a near-duplicate; None turns it off
+        self.dedup_distance = dedup_distance
+        self.simhash_index = None
+
+        # Optional hooks for running under a UI: progress(stats) is called
+        # from the crawl thread; setting pause_event/cancel_event pauses or
+        # stops the crawl between pages.
+        self.progress = progress
+        self.cancel_event = cancel_event
+        self.pause_event = pause_event
+
+        self.frontier = deque()
+        self.seen = set()
+        self.retries = {}
+        self.in_flight = {}
+        self.fetched = 0
+        self.indexed = 0
+        self.errors = 0
+        self.unchanged = 0
+        self.duplicates = 0
+        self.last_error = None
+
+    @classmethod
+    def resume(cls, job_id=None, db=None, **options):
+        """
+        Rebuilds a stopped or crashed resumable crawl from its checkpoint:
+        the frontier, seen URLs, retry counts, counters and host timing.
+        Without job_id, picks the most recent unfinished job. Returns None
+        if there is nothing to resume.
+        """
+        db = db or DatabaseManager()
+        job = db.get_crawl_job(job_id)
+        if job is None:
+            return None
+
+        # The job's own limits win over any passed for a fresh crawl
+        options.update(max_depth=job['max_depth'], max_pages=job['max_pages'], refresh=job['refresh'],
+                       resumable=True)
+        crawler = cls(job['seeds'], db=db, **options)
+        crawler.job_id = job['job_ID']
+        for key in ('fetched', 'indexed', 'errors', 'unchanged', 'duplicates'):
+            setattr(crawler, key, job[key])
+
+        settled = 0
+        for url, depth, retries, status in db.get_frontier(crawler.job_id):
+            crawler.seen.add(url_key(url))
+            if retries:
+                crawler.retries[url] = retries
+            if status == 'queued':
+                crawler.frontier.append((url, depth))
+            elif status in ('done', 'failed'):
+                settled += 1
+        # Counters are checkpointed less often than pages commit after a crash
+        crawler.fetched = max(crawler.fetched, settled)
+        crawler.fetcher.scheduler.restore_state(db.get_host_state(crawler.job_id))
+        print(f"Resuming crawl {crawler.job_id}: {len(crawler.frontier)} queued, {crawler.fetched} fetched.")
+        return crawler
+
+    def enqueue(self, url, depth):
+        """
+        Canonicalizes a URL and adds it to the frontier unless it was already
+        seen this crawl. Returns the canonical URL if it was added, else None.
+        """
+        url = canonicalize(url)
+        if url is None:
+            return None
+        key = url_key(url)
+        if key in self.seen:
+            return None
+        self.seen.add(key)
+        self.frontier.append((url, depth))
+        return url
+
+    def enqueue_all(self, urls, depth):
+        """Enqueues several URLs, persisting the new ones for a resumable crawl."""
+        added = []
+        for url in urls:
+            url = self.enqueue(url, depth)
+            if url:
+                added.append((url, depth))
+        if added and self.job_id:
+            self.db.add_frontier_urls(self.job_id, added)
+        return len(added)
+
+    def _settle(self, url, status, retries=None):
+        """Records what happened to a frontier URL (resumable crawls only)."""
+        if self.job_id:
+            self.db.set_frontier_status(self.job_id, url, status, retries)
+
+    def _checkpoint(self, status='running'):
+        if self.job_id:
+            self.db.save_crawl_checkpoint(self.job_id, status, self.stats(),
+                                          self.fetcher.scheduler.export_state(), datetime.now())
+
+    def _claim(self, url, depth):
+        """Looks the URL up in the DB; returns a task, or None if it should be skipped."""
+        state = self.db.get_fetch_state(url)
+        if not self.refresh and (state or self.db.get_duplicate_of(url)):
+            self._settle(url, 'skipped')
+            return None
+        return url, depth, state
+
+    def _next_task(self, force=False):
+        """
+        Pops the next URL to fetch, preferring hosts with a free politeness
+        slot so workers spread across hosts instead of queueing behind one.
+        With force=True a busy host is returned rather than nothing.
+        Already indexed URLs are skipped unless this is a refresh crawl.
+        """
+        deferred = []
+        task = None
+        scanned = 0
+        while self.frontier and scanned < self.SCAN_LIMIT:
+            url, depth = self.frontier.popleft()
+            scanned += 1
+            if self.in_flight.get(urlsplit(url).netloc, 0) >= self.fetcher.scheduler.concurrency:
+                deferred.append((url, depth))
+                continue
+            task = self._claim(url, depth)
+            if task:
+                break
+
+        # Put busy-host URLs back at the front in their original order
+        self.frontier.extendleft(reversed(deferred))
+        while task is None and force and self.frontier:
+            task = self._claim(*self.frontier.popleft())
+        return task
+
+    def _fetch_and_extract(self, url, state):
+        """
+        Worker: fetch one page and, when there is no parse pool, parse and
+        analyze it too. Never touches the DB. Returns (scraper, body, page).
+        """
+        scraper = Scraper(url, db=self.db, keywords_manager=self.keywords_manager, fetcher=self.fetcher,
+                          fetch_state=state)
+        start = time.perf_counter()
+        # Parsing in this thread can start while the body downloads
+        body = scraper.fetch_html(stream=self.parse_pool is None)
+        # Tokenizing during the download is booked as parse time (see Scraper.extract)
+        self.metrics.observe_stage('fetch', time.perf_counter() - start - scraper.parse_seconds)
+        page = None
+        if body and self.parse_pool is None:
+            page = scraper.extract(body)
+        return scraper, body, page
+
+    def stats(self, in_flight=0, url=None):
+        return {
+            'fetched': self.fetched,
+            'indexed': self.indexed,
+            'errors': self.errors,
+            'unchanged': self.unchanged,
+            'duplicates': self.duplicates,
+            'queued': len(self.frontier),
+            'in_flight': in_flight,
+            'url': url,
+            'last_error': self.last_error,
+            # p50/p99 per stage, and the hosts failing most, for display
+            'stages': self.metrics.format_stages(),
+            'error_hosts': sorted(self.metrics.host_errors().items(), key=lambda item: -item[1][0])[:3],
+        }
+
+    def _report(self, in_flight=0, url=None):
+        if self.progress:
+            self.progress(self.stats(in_flight, url))
+
+    def _cancelled(self):
+        return self.cancel_event is not None and self.cancel_event.is_set()
+
+    def _paused(self):
+        return self.pause_event is not None and self.pause_event.is_set()
+
+    def _store(self, scraper, page, depth, in_flight):
+        """Writer stage: runs on the crawl thread only."""
+        if not page:
+            if scraper.error:
+                self._fail(scraper.url, depth, scraper.error, in_flight, retry=scraper.retryable)
+            else:
+                self.metrics.inc('pages', outcome='skipped' if scraper.skipped else 'empty')
+                self._settle(scraper.url, 'done')
+            return
+
+        # Parse-stage timings travel with the page, from a worker process if need be
+        for stage, seconds in page.get('timings', {}).items():
+            self.metrics.observe_stage(stage, seconds)
+
+        if self._is_duplicate(scraper.url, page):
+            self.metrics.inc('pages', outcome='duplicate')
+            self.duplicates += 1
+            self._settle(scraper.url, 'duplicate')
+            self._report(in_flight, scraper.url)
+            return
+
+        # Queue the links first so they commit in the same transaction as the page
+        if depth < self.max_depth:
+            self.enqueue_all(page['links'], depth + 1)
+        self._settle(scraper.url, 'done')
+        with self.metrics.timer('store'):
+            web_id = scraper.store(page)
+        self.metrics.inc('pages', outcome='indexed')
+        if self.simhash_index is not None and page['simhash'] is not None and web_id:
+            self.simhash_index.add(page['simhash'], web_id)
+        self.indexed += 1
+        if self.indexed % self.commit_every == 0:
+            self._checkpoint()
+        self._report(in_flight, scraper.url)
+
+    def _is_duplicate(self, url, page):
+        """Checks a page against the SimHash index; records it if it's a near-duplicate."""
+        if self.simhash_index is None or page['simhash'] is None:
+            return False
+        match = self.simhash_index.find(page['simhash'], exclude=page['web_id'])
+        if match is None:
+            return False
+        web_id, distance = match
+        print(f"Skipping {url}: near-duplicate of page {web_id} ({distance} bits)")
+        self.db.add_duplicate(url, web_id, distance, datetime.now())
+        return True
+
+    def _fail(self, url, depth, error, in_flight, retry=True):
+        retries = self.retries.get(url, 0)
+        if retry and retries < self.max_retries:
+            # Try again at the back of the queue; retries don't use up the page budget
+            print(f"Retrying {url} later: {error}")
+            self.metrics.inc('pages', outcome='retried')
+            self.retries[url] = retries + 1
+            self.frontier.append((url, depth))
+            self.fetched -= 1
+            self._settle(url, 'queued', retries + 1)
+            return
+
+        print(f"Error crawling {url}: {error}")
+        self.metrics.inc('pages', outcome='failed')
+        self.errors += 1
+        self.last_error = f"{url}: {error}"
+        self._settle(url, 'failed')
+        self._report(in_flight, url)
+
+    def run(self):
+        """
+        Runs the crawl as a staged pipeline: fetch threads -> parse stage
+        (worker processes when parse_workers > 0, else the fetch threads)
+        -> a single writer on this thread. Fetching stops while the parse
+        stage is at capacity.
+        """
+        # The DB handle may outlive this crawl (GUI, CLI): time its commits only while it runs
+        db_metrics, self.db.metrics = self.db.metrics, self.metrics
+        exporter = None
+        try:
+            if self.resumable and self.job_id is None:
+                self.job_id = self.db.create_crawl_job(self.seeds, self.max_depth, self.max_pages,
+                                                       self.refresh, datetime.now())
+            self.enqueue_all(self.seeds, 0)
+
+            if self.dedup_distance is not None:
+                self.simhash_index = SimHashIndex(self.dedup_distance)
+                for web_id, fingerprint in self.db.get_simhashes():
+                    self.simhash_index.add(fingerprint, web_id)
+
+            if self.parse_workers:
+                self.parse_pool = ParsePool(self.parse_workers)
+            parse_limit = self.parse_pool.max_pending if self.parse_pool else float('inf')
+
+            if self.metrics_path:
+                exporter = MetricsExporter(self.metrics, self.metrics_path, self.metrics_interval).start()
+
+            self._crawl(parse_limit)
+        finally:
+            if self.parse_pool is not None:
+                self.parse_pool.shutdown()
+                self.parse_pool = None
+            self.fetcher.close()
+            if exporter is not None:
+                exporter.stop()
+            self.db.metrics = db_metrics
+
+        print(f"Crawl finished: {self.indexed} indexed, {self.unchanged} unchanged, "
+              f"{self.duplicates} duplicates, {self.fetched} fetched, {self.errors} errors.")
+        return self.indexed
+
+    def _crawl(self, parse_limit):
+        """The scheduling loop; fetching/parsing map each future to its page."""
+        fetching = {}
+        parsing = {}
+        status = 'done'
+        with ThreadPoolExecutor(max_workers=self.workers) as pool, self.db.batch(self.commit_every):
+            while self.frontier or fetching or parsing:
+                self.metrics.set('queue_depth', len(self.frontier), queue='frontier')
+                self.metrics.set('queue_depth', len(fetching), queue='fetching')
+                self.metrics.set('queue_depth', len(parsing), queue='parsing')
+                if self._cancelled():
+                    # Drop queued work; fetches already running finish unseen.
+                    # Their URLs stay queued, so they don't count as fetched.
+                    for future in list(fetching) + list(parsing):
+                        future.cancel()
+                    self.fetched -= len(fetching) + len(parsing)
+                    print("Crawl cancelled.")
+                    status = 'stopped'
+                    break
+
+                # 1. Keep every fetch worker busy while the page budget and parse stage allow
+                while (not self._paused() and len(fetching) < self.workers and len(parsing) < parse_limit
+                       and self.fetched < self.max_pages):
+                    task = self._next_task(force=not (fetching or parsing))
+                    if task is None:
+                        break
+                    url, depth, state = task
+                    host = urlsplit(url).netloc
+                    self.in_flight[host] = self.in_flight.get(host, 0) + 1
+                    fetching[pool.submit(self._fetch_and_extract, url, state)] = (url, depth)
+                    self.fetched += 1
+
+                if not (fetching or parsing):
+                    if self._paused():
+                        # Don't hold the write lock while nothing happens
+                        self.db.commit()
+                        time.sleep(0.2)
+                        continue
+                    break
+
+                # 2. Hand fetched bodies to the parse stage, store parsed pages, grow the frontier
+                done, _ = wait(list(fetching) + list(parsing), timeout=0.5, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in fetching:
+                        url, depth = fetching.pop(future)
+                        self.in_flight[urlsplit(url).netloc] -= 1
+                        try:
+                            scraper, body, page = future.result()
+                        except Exception as e:
+                            self._fail(url, depth, e, len(fetching) + len(parsing))
+                            continue
+                        if scraper.not_modified:
+                            self.db.touch_page(scraper.fetch_state[0], datetime.now(),
+                                               scraper.etag, scraper.last_modified)
+                            self._settle(url, 'done')
+                            self.metrics.inc('pages', outcome='unchanged')
+                            self.unchanged += 1
+                            # The page's links didn't change either: follow the stored ones
+                            if depth < self.max_depth:
+                                self.enqueue_all(self.db.get_outlinks(scraper.fetch_state[0]), depth + 1)
+                            self._report(len(fetching) + len(parsing), url)
+                            continue
+                        if body and self.parse_pool is not None:
+                            parsing[self.parse_pool.submit(url, body, scraper.charset, scraper.base_url)] = (scraper, depth)
+                            continue
+                    else:
+                        scraper, depth = parsing.pop(future)
+                        try:
+                            page = future.result()
+                        except Exception as e:
+                            self._fail(scraper.url, depth, e, len(fetching) + len(parsing), retry=False)
+                            continue
+                        if page:
+                            page.update(scraper.fetch_info())
+
+                    self._store(scraper, page, depth, len(fetching) + len(parsing))
+
+            # A crash never gets here, so its job stays 'running' and resumable
+            self._checkpoint(status)
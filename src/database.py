@@ -1,32 +1,262 @@
+import json
 import sqlite3
+import sys
+from array import array
 import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from src.setup_db import migrate, TEXT_COMPRESSION
+
+def pack_text(text):
+    return zlib.compress((text or '').encode('utf-8'), TEXT_COMPRESSION)
+
+def unpack_text(blob):
+    return zlib.decompress(blob).decode('utf-8') if blob else ''
+
+def pack_ids(ids):
+    """Packs integer IDs as little-endian int32s for the link table."""
+    packed = array('i', ids)
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return packed.tobytes()
+
+def unpack_ids(blob):
+    ids = array('i')
+    ids.frombytes(blob)
+    if sys.byteorder == 'big':
+        ids.byteswap()
+    return ids
+
+# Inserts a page's category_rank row, boosted by whatever authority the page already has
+RANK_INSERT = '''
+    INSERT OR REPLACE INTO category_rank (webpage_ID, category, score, blended)
+    SELECT webpage_ID, ?, ?, ? * (1 + ? * COALESCE(authority, 0)) FROM webpage WHERE webpage_ID = ?
+'''
+
+def primary_category(categories):
+    """
+    Picks a page's ranking category from its {category: count} hits.
+    Returns (category, score) or None when nothing matched. The score is
+    the hit count scaled by the category's share of all hits (count² /
+    total), so a page that is mostly about one topic outranks a page that
+    mentions it as often among many others. Ties go to the first name.
+    """
+    hits = {cat: n for cat, n in categories.items() if n and n > 0}
+    if not hits:
+        return None
+    category = min(hits, key=lambda cat: (-hits[cat], cat))
+    return category, hits[category] * hits[category] / sum(hits.values())
+
+class _BatchState(threading.local):
+    """One thread's batch() nesting and periodic-commit counters."""
+    def __init__(self):
+        self.depth = 0
+        self.pages = 0
+        self.commit_every = None
+        self.started = 0.0
 
 class DatabaseManager:
+    # Read results kept by _cached(); any write, through this or another connection, empties the cache
+    CACHE_SIZE = 256
+    # How much link authority (0-1, from src/linkrank.py) can boost a ranking:
+    # the top page scores up to 1 + AUTHORITY_WEIGHT times its content score
+    AUTHORITY_WEIGHT = 1.0
+    # Seconds a write waits for another connection's transaction before 'database is locked'
+    BUSY_TIMEOUT = 30
+    # A batch() commits at least this often, so other writers never wait long on a crawl
+    COMMIT_SECONDS = 2.0
+
     def __init__(self, db_name="linksurfer.db"):
         # Sets DB path relative to this file
         base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         self.db_path = os.path.join(base_dir, 'data', db_name)
+
+        # One long-lived connection, shared by threads under a lock
+        self._conn = None
+        self._lock = threading.RLock()
+        # Batches are per thread; the open transaction belongs to one thread
+        # at a time (_owner), and other threads' writes wait until it commits
+        self._batch = _BatchState()
+        self._owner = None
+        self._waiting = 0
+        self._released = threading.Condition(self._lock)
+        # Optional Metrics (see src/metrics.py); commits are timed as the 'db_commit' stage
+        self.metrics = None
+        self._cache = OrderedDict()
+        # PRAGMA data_version the cache was filled at; other connections' commits change it
+        self._data_version = None
+
         self._init_db()
 
     def _get_connection(self):
-        return sqlite3.connect(self.db_path)
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, timeout=self.BUSY_TIMEOUT, check_same_thread=False)
+            # WAL lets readers run during a crawl and makes commits cheaper
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.commit()
+                self._conn.close()
+                self._conn = None
+            self._release()
+
+    def _claim(self):
+        """
+        Makes this thread the writer of the open transaction, first waiting
+        for another thread's transaction to commit. Call with _lock held.
+        """
+        me = threading.get_ident()
+        if self._owner not in (None, me):
+            self._waiting += 1
+            try:
+                if not self._released.wait_for(lambda: self._owner is None, self.BUSY_TIMEOUT):
+                    raise sqlite3.OperationalError("database is locked")
+            finally:
+                self._waiting -= 1
+        self._owner = me
+        return self._get_connection()
+
+    def _release(self):
+        self._owner = None
+        self._released.notify_all()
+
+    def _owns(self):
+        return self._owner == threading.get_ident()
+
+    def _commit(self):
+        """Commits unless this thread's batch is holding the transaction open."""
+        if self._batch.depth == 0 or self._commit_due():
+            self._commit_now()
+
+    def _commit_due(self):
+        """
+        True when a batch with commit_every should commit early: another
+        thread is waiting to write, or COMMIT_SECONDS have passed. Nested
+        batches stay atomic.
+        """
+        batch = self._batch
+        return bool(batch.depth == 1 and batch.commit_every and
+                    (self._waiting or time.monotonic() - batch.started >= self.COMMIT_SECONDS))
+
+    def _commit_now(self):
+        if not self._owns():
+            return
+        conn = self._get_connection()
+        if self.metrics is None or not conn.in_transaction:
+            conn.commit()
+        else:
+            start = time.perf_counter()
+            conn.commit()
+            self.metrics.observe_stage('db_commit', time.perf_counter() - start)
+        self._batch.pages = 0
+        self._batch.started = time.monotonic()
+        self._release()
+
+    def _rollback(self):
+        if self._owns():
+            self._get_connection().rollback()
+            # Reads cached since the write saw rows that are gone now
+            self._invalidate()
+            self._release()
+
+    def commit(self):
+        """Commits this thread's open transaction now, e.g. while its batch sits idle."""
+        with self._lock:
+            self._commit_now()
+
+    @contextmanager
+    def batch(self, commit_every=None):
+        """
+        Groups writes into one transaction that commits when the block exits.
+        With commit_every, add_page also commits after that many pages, or
+        after COMMIT_SECONDS, so a long bulk crawl doesn't hold one giant
+        transaction (and the write lock) for long, and commits early when
+        another thread wants to write. Batches are per thread: another
+        thread's writes wait for this one's transaction rather than join it.
+        """
+        batch = self._batch
+        batch.depth += 1
+        if batch.depth == 1:
+            batch.commit_every = commit_every
+            batch.pages = 0
+            batch.started = time.monotonic()
+        try:
+            yield self
+        except Exception:
+            with self._lock:
+                if batch.depth == 1:
+                    self._rollback()
+            raise
+        finally:
+            with self._lock:
+                batch.depth -= 1
+                self._commit()
+
+    def _cached(self, key, load):
+        """
+        Returns load() for key, from an in-process LRU cache when possible.
+        The cache is emptied first if another connection (a crawl in another
+        process or DatabaseManager) has committed since it was filled.
+        """
+        with self._lock:
+            version = self._get_connection().execute('PRAGMA data_version').fetchone()[0]
+            if version != self._data_version:
+                self._cache.clear()
+                self._data_version = version
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+            value = load()
+            self._cache[key] = value
+            if len(self._cache) > self.CACHE_SIZE:
+                self._cache.popitem(last=False)
+            return value
+
+    def _invalidate(self):
+        self._cache.clear()
 
     def _init_db(self):
-        # Optional: Add table creation logic here if needed for a fresh install
-        pass
+        # Creates a fresh DB or upgrades an older schema in place
+        migrate(self.db_path)
 
     def execute_write(self, query, params=()):
         """Executes INSERT, UPDATE, DELETE queries safely."""
-        with self._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            conn.commit()
+        with self._lock:
+            conn = self._claim()
+            self._invalidate()
+            try:
+                cursor = conn.execute(query, params)
+                self._commit()
+            except Exception:
+                if self._batch.depth == 0:
+                    self._rollback()
+                raise
+            return cursor.lastrowid
+
+    def execute_many(self, query, rows):
+        """Executes one statement for every row in a single transaction."""
+        with self._lock:
+            conn = self._claim()
+            self._invalidate()
+            try:
+                conn.executemany(query, rows)
+                self._commit()
+            except Exception:
+                if self._batch.depth == 0:
+                    self._rollback()
+                raise
 
     def execute_read(self, query, params=(), fetch_all=False):
         """Executes SELECT queries."""
-        with self._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(query, params)
+        with self._lock:
+            cursor = self._get_connection().execute(query, params)
             if fetch_all:
                 return cursor.fetchall()
             return cursor.fetchone()
@@ -35,7 +265,7 @@ class DatabaseManager:
 
     def get_recent_files(self, limit=10):
         query = 'SELECT url FROM Metadata ORDER BY date ASC LIMIT ?'
-        return self.execute_read(query, (limit,), fetch_all=True)
+        return self._cached(('recent', limit), lambda: self.execute_read(query, (limit,), fetch_all=True))
 
     def check_link_exists(self, url):
         query = 'SELECT webpage_ID FROM webpage WHERE url=?'
@@ -46,54 +276,506 @@ class DatabaseManager:
         result = self.execute_read('SELECT webpage_ID FROM webpage WHERE url=?', (url,))
         return result[0] if result else None
 
+    def get_fetch_state(self, url):
+        """Returns (web_id, etag, last_modified, content_hash) for an indexed url, or None."""
+        query = 'SELECT webpage_ID, etag, last_modified, content_hash FROM webpage WHERE url=?'
+        return self.execute_read(query, (url,))
+
+    def get_stale_urls(self, limit=100):
+        """Indexed urls, least recently fetched first, for a refresh crawl."""
+        query = 'SELECT url FROM webpage ORDER BY fetched_at ASC LIMIT ?'
+        return [r[0] for r in self.execute_read(query, (limit,), fetch_all=True)]
+
+    def get_duplicate_of(self, url):
+        """URL of the indexed page that url was skipped as a near-duplicate of, or None."""
+        query = '''
+            SELECT w.url FROM duplicate d
+            JOIN webpage w ON w.webpage_ID = d.webpage_ID
+            WHERE d.url = ?
+        '''
+        result = self.execute_read(query, (url,))
+        return result[0] if result else None
+
+    def get_simhashes(self):
+        """(webpage_ID, simhash) for every fingerprinted page, to seed a SimHashIndex."""
+        return self.execute_read('SELECT webpage_ID, simhash FROM webpage WHERE simhash IS NOT NULL',
+                                 fetch_all=True)
+
     def get_summary(self, url):
         result = self.execute_read('SELECT summary FROM webpage WHERE url=?', (url,))
         return result[0] if result else "No summary available."
 
     def get_keywords(self, url):
-        web_id = self.get_web_id(url)
-        if web_id:
-            query = 'SELECT keyword FROM Keywords WHERE webpage_ID=? ORDER BY keyword_count DESC'
-            results = self.execute_read(query, (web_id,), fetch_all=True)
-            return [r[0] for r in results]
-        return []
+        query = '''
+            SELECT k.keyword
+            FROM webpage w
+            JOIN Keywords k ON k.webpage_ID = w.webpage_ID
+            WHERE w.url = ?
+            ORDER BY k.keyword_count DESC
+        '''
+        results = self.execute_read(query, (url,), fetch_all=True)
+        return [r[0] for r in results]
+
+    def get_page(self, url, keyword_limit=20):
+        """
+        Everything the summary screen shows, in one query: a dict with the
+        page's summary, primary category and top keywords, or None if the
+        url isn't indexed.
+        """
+        query = '''
+            SELECT w.summary, r.category, k.keyword
+            FROM webpage w
+            LEFT JOIN category_rank r ON r.webpage_ID = w.webpage_ID
+            LEFT JOIN Keywords k ON k.webpage_ID = w.webpage_ID
+            WHERE w.url = ?
+            ORDER BY k.keyword_count DESC
+            LIMIT ?
+        '''
+        def load():
+            rows = self.execute_read(query, (url, keyword_limit), fetch_all=True)
+            if not rows:
+                return None
+            return {'summary': rows[0][0], 'category': rows[0][1],
+                    'keywords': [keyword for _, _, keyword in rows if keyword is not None]}
+        return self._cached(('page', url, keyword_limit), load)
+
+    def get_related_urls(self, url, limit=5):
+        """Top-ranked pages sharing url's primary category, best first."""
+        query = '''
+            SELECT w.url
+            FROM category_rank r
+            JOIN webpage w ON w.webpage_ID = r.webpage_ID
+            WHERE r.category = (
+                SELECT r2.category FROM webpage w2
+                JOIN category_rank r2 ON r2.webpage_ID = w2.webpage_ID
+                WHERE w2.url = ?
+            )
+            ORDER BY r.blended DESC, r.webpage_ID
+            LIMIT ?
+        '''
+        return self._cached(('related', url, limit),
+                            lambda: self.execute_read(query, (url, limit), fetch_all=True))
+
+    def get_page_text(self, url):
+        """
+        A page's full extracted text as (headings, body), each newline-joined,
+        or None. Stored compressed and read only on demand, so it isn't cached.
+        """
+        query = '''
+            SELECT t.headings, t.body
+            FROM webpage w
+            JOIN page_text t ON t.webpage_ID = w.webpage_ID
+            WHERE w.url = ?
+        '''
+        row = self.execute_read(query, (url,))
+        return (unpack_text(row[0]), unpack_text(row[1])) if row else None
+
+    def iter_pages(self, category=None, batch_size=500):
+        """
+        Yields (url, summary, category, headings, body) for every indexed page,
+        or only those whose primary category is category, in web ID order.
+        Reads batch_size pages per query, so exports stream in flat memory.
+        """
+        query = f'''
+            SELECT w.webpage_ID, w.url, w.summary, r.category, t.headings, t.body
+            FROM webpage w
+            LEFT JOIN category_rank r ON r.webpage_ID = w.webpage_ID
+            LEFT JOIN page_text t ON t.webpage_ID = w.webpage_ID
+            WHERE w.webpage_ID > ? {'AND r.category = ?' if category else ''}
+            ORDER BY w.webpage_ID
+            LIMIT ?
+        '''
+        last_id = 0
+        while True:
+            params = (last_id, category, batch_size) if category else (last_id, batch_size)
+            rows = self.execute_read(query, params, fetch_all=True)
+            for web_id, url, summary, page_category, headings, body in rows:
+                yield url, summary, page_category, unpack_text(headings), unpack_text(body)
+            if len(rows) < batch_size:
+                return
+            last_id = rows[-1][0]
+
+    def get_index_stats(self):
+        """Counts for a status report: pages, duplicates, text size and pages per category."""
+        pages, last_fetched = self.execute_read('SELECT COUNT(*), MAX(fetched_at) FROM webpage')
+        duplicates = self.execute_read('SELECT COUNT(*) FROM duplicate')[0]
+        text_bytes = self.execute_read('SELECT COALESCE(SUM(LENGTH(headings) + LENGTH(body)), 0) FROM page_text')[0]
+        categories = self.execute_read('SELECT category, COUNT(*) FROM category_rank GROUP BY category '
+                                       'ORDER BY COUNT(*) DESC', fetch_all=True)
+        return {'pages': pages, 'duplicates': duplicates, 'last_fetched': last_fetched,
+                'text_bytes': text_bytes, 'categories': dict(categories)}
 
     def get_categories_by_url(self, url):
-        web_id = self.get_web_id(url)
-        if web_id:
-            query = 'SELECT category FROM Category WHERE webpage_ID=? ORDER BY category_count DESC'
-            return self.execute_read(query, (web_id,), fetch_all=True)
-        return []
-
-    def get_urls_by_category(self, category):
-        # Joins tables to find URLs belonging to a specific category
         query = '''
-            SELECT w.url 
+            SELECT c.category
             FROM webpage w
-            JOIN Category c ON w.webpage_ID = c.webpage_ID
-            WHERE c.category = ?
+            JOIN Category c ON c.webpage_ID = w.webpage_ID
+            WHERE w.url = ?
             ORDER BY c.category_count DESC
         '''
-        return self.execute_read(query, (category,), fetch_all=True)
+        return self.execute_read(query, (url,), fetch_all=True)
+
+    def get_urls_by_category(self, category, limit=-1):
+        """URLs of pages whose primary category is category, best first."""
+        query = '''
+            SELECT w.url
+            FROM category_rank r
+            JOIN webpage w ON w.webpage_ID = r.webpage_ID
+            WHERE r.category = ?
+            ORDER BY r.blended DESC, r.webpage_ID
+            LIMIT ?
+        '''
+        return self._cached(('category', category, limit),
+                            lambda: self.execute_read(query, (category, limit), fetch_all=True))
+
+    def search_pages(self, match, limit=10, offset=0, authority_weight=None):
+        """
+        Runs an FTS5 MATCH expression and returns (url, summary, score) rows,
+        best first. Scores are negated BM25, so higher is better; headings
+        weigh three times as much as body text. Pages are boosted by their
+        link authority times authority_weight (AUTHORITY_WEIGHT by default).
+        """
+        weight = self.AUTHORITY_WEIGHT if authority_weight is None else authority_weight
+        if weight:
+            # Every match is joined to its authority before the top rows are picked
+            query = '''
+                SELECT w.url, w.summary, -bm25(page_fts, 3.0, 1.0) * (1 + ? * COALESCE(w.authority, 0)) AS score
+                FROM page_fts
+                JOIN webpage w ON w.webpage_ID = page_fts.rowid
+                WHERE page_fts MATCH ?
+                ORDER BY score DESC
+                LIMIT ? OFFSET ?
+            '''
+            return self._cached(('search', match, limit, offset, weight),
+                                lambda: self.execute_read(query, (weight, match, limit, offset), fetch_all=True))
+
+        # Rank inside the FTS table first so only the top rows are joined
+        query = '''
+            SELECT w.url, w.summary, -r.score
+            FROM (
+                SELECT rowid, bm25(page_fts, 3.0, 1.0) AS score
+                FROM page_fts
+                WHERE page_fts MATCH ?
+                ORDER BY score
+                LIMIT ? OFFSET ?
+            ) r
+            JOIN webpage w ON w.webpage_ID = r.rowid
+            ORDER BY r.score
+        '''
+        return self._cached(('search', match, limit, offset, 0),
+                            lambda: self.execute_read(query, (match, limit, offset), fetch_all=True))
 
     # --- Write Methods ---
 
+    @contextmanager
+    def _page_write(self):
+        """
+        Runs one page's writes atomically. Inside batch() the page joins the
+        open transaction behind a savepoint, so a failed page never leaves
+        half its rows; outside a batch it commits on exit.
+        """
+        with self._lock:
+            conn = self._claim()
+            self._invalidate()
+            if not conn.in_transaction:
+                conn.execute('BEGIN')
+            conn.execute('SAVEPOINT page_write')
+            try:
+                yield conn
+            except Exception:
+                conn.execute('ROLLBACK TO page_write')
+                conn.execute('RELEASE page_write')
+                if self._batch.depth == 0:
+                    self._rollback()
+                raise
+            conn.execute('RELEASE page_write')
+
+            batch = self._batch
+            if batch.depth:
+                batch.pages += 1
+                if batch.commit_every and batch.pages >= batch.commit_every or self._commit_due():
+                    self._commit_now()
+            else:
+                self._commit_now()
+
+    def _insert_page_rows(self, conn, web_id, keywords, categories, headings_text, body_text, links):
+        conn.executemany("INSERT INTO Keywords (keyword, keyword_count, webpage_ID) VALUES (?, ?, ?)",
+                         [(k, c, web_id) for k, c in keywords.items()])
+        # Only categories the page actually matched get a row
+        conn.executemany("INSERT INTO Category (category, category_count, webpage_ID) VALUES (?, ?, ?)",
+                         [(cat, c, web_id) for cat, c in categories.items() if c])
+        rank = primary_category(categories)
+        if rank:
+            category, score = rank
+            conn.execute(RANK_INSERT, (category, score, score, self.AUTHORITY_WEIGHT, web_id))
+        if links is not None:
+            self._insert_links(conn, web_id, links)
+        conn.execute("INSERT INTO page_text (webpage_ID, headings, body) VALUES (?, ?, ?)",
+                     (web_id, pack_text(headings_text), pack_text(body_text)))
+        conn.execute("INSERT INTO page_fts (rowid, headings, body) VALUES (?, ?, ?)",
+                     (web_id, headings_text, body_text))
+
+    @staticmethod
+    def _insert_links(conn, web_id, links):
+        """Stores a page's outbound links as one packed row of target url_IDs."""
+        urls = list(dict.fromkeys(links))
+        conn.executemany("INSERT OR IGNORE INTO link_url (url) VALUES (?)", [(url,) for url in urls])
+        ids = conn.execute("SELECT url_ID FROM link_url WHERE url IN (SELECT value FROM json_each(?)) "
+                           "ORDER BY url_ID", (json.dumps(urls),)).fetchall()
+        conn.execute("INSERT OR REPLACE INTO link (source_ID, targets) VALUES (?, ?)",
+                     (web_id, pack_ids([url_id for url_id, in ids])))
+
+    def add_page(self, url, summary, owner, heading, paragraph, date, keywords, categories,
+                 headings_text='', body_text='', etag=None, last_modified=None, content_hash=None,
+                 simhash=None, links=None):
+        """
+        Stores a whole indexed page (webpage, metadata, keyword, category,
+        link and full-text rows) in one transaction and returns its new web
+        ID. keywords and categories map name -> count; links are the page's
+        outbound URLs.
+        """
+        with self._page_write() as conn:
+            web_id = conn.execute(
+                "INSERT INTO webpage (url, summary, etag, last_modified, content_hash, fetched_at, simhash) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, summary, etag, last_modified, content_hash, date, simhash)).lastrowid
+            conn.execute("INSERT INTO Metadata (url, owner, heading, paragraph, date) VALUES (?, ?, ?, ?, ?)",
+                         (url, owner, heading, paragraph, date))
+            self._insert_page_rows(conn, web_id, keywords, categories, headings_text, body_text, links)
+        return web_id
+
+    def update_page(self, web_id, url, summary, heading, paragraph, date, keywords, categories,
+                    headings_text='', body_text='', etag=None, last_modified=None, content_hash=None,
+                    simhash=None, links=None):
+        """
+        Replaces the content of an already indexed page in place: summary,
+        metadata, keyword, category and full-text rows keep the same web ID.
+        Its links are replaced too unless links is None.
+        """
+        with self._page_write() as conn:
+            conn.execute("UPDATE webpage SET summary=?, etag=?, last_modified=?, content_hash=?, fetched_at=?, "
+                         "simhash=? WHERE webpage_ID=?",
+                         (summary, etag, last_modified, content_hash, date, simhash, web_id))
+            conn.execute("UPDATE Metadata SET heading=?, paragraph=?, date=? WHERE url=?",
+                         (heading, paragraph, date, url))
+            conn.execute("DELETE FROM Keywords WHERE webpage_ID=?", (web_id,))
+            conn.execute("DELETE FROM Category WHERE webpage_ID=?", (web_id,))
+            conn.execute("DELETE FROM category_rank WHERE webpage_ID=?", (web_id,))
+            # page_fts keeps no text of its own; removing a row means replaying the old text
+            old = conn.execute("SELECT headings, body FROM page_text WHERE webpage_ID=?", (web_id,)).fetchone()
+            if old:
+                conn.execute("INSERT INTO page_fts (page_fts, rowid, headings, body) VALUES ('delete', ?, ?, ?)",
+                             (web_id, unpack_text(old[0]), unpack_text(old[1])))
+            conn.execute("DELETE FROM page_text WHERE webpage_ID=?", (web_id,))
+            self._insert_page_rows(conn, web_id, keywords, categories, headings_text, body_text, links)
+
+    def touch_page(self, web_id, date, etag=None, last_modified=None):
+        """Records a re-fetch that found no changes (304 or identical content)."""
+        query = '''
+            UPDATE webpage
+            SET fetched_at=?, etag=COALESCE(?, etag), last_modified=COALESCE(?, last_modified)
+            WHERE webpage_ID=?
+        '''
+        self.execute_write(query, (date, etag, last_modified, web_id))
+
+    def add_duplicate(self, url, web_id, distance, date):
+        """Records that url was skipped as a near-duplicate of page web_id."""
+        query = "INSERT OR REPLACE INTO duplicate (url, webpage_ID, distance, date) VALUES (?, ?, ?, ?)"
+        self.execute_write(query, (url, web_id, distance, date))
+
     def add_metadata_record(self, url, owner, heading, paragraph, date):
-        query = "INSERT INTO Metadata VALUES (?, ?, ?, ?, ?)"
+        query = "INSERT INTO Metadata (url, owner, heading, paragraph, date) VALUES (?, ?, ?, ?, ?)"
         self.execute_write(query, (url, owner, heading, paragraph, date))
 
-    def add_webpage_record(self, web_id, url, summary):
-        query = "INSERT INTO webpage VALUES (?, ?, ?)"
-        self.execute_write(query, (web_id, url, summary))
+    def add_webpage_record(self, url, summary):
+        """Inserts a webpage row and returns its new web ID."""
+        query = "INSERT INTO webpage (url, summary) VALUES (?, ?)"
+        return self.execute_write(query, (url, summary))
         
     def add_category_record(self, category, count, web_id):
-        query = "INSERT INTO Category VALUES (?, ?, ?)"
+        if not count:
+            return
+        query = "INSERT INTO Category (category, category_count, webpage_ID) VALUES (?, ?, ?)"
         self.execute_write(query, (category, count, web_id))
+        self.update_category_rank(web_id)
+
+    def update_category_rank(self, web_id):
+        """Recomputes one page's category_rank row from its Category rows."""
+        rows = self.execute_read('SELECT category, category_count FROM Category WHERE webpage_ID=?',
+                                 (web_id,), fetch_all=True)
+        rank = primary_category(dict(rows))
+        if rank:
+            category, score = rank
+            self.execute_write(RANK_INSERT, (category, score, score, self.AUTHORITY_WEIGHT, web_id))
+        else:
+            self.execute_write("DELETE FROM category_rank WHERE webpage_ID=?", (web_id,))
 
     def add_keyword_record(self, keyword, count, web_id):
-        query = "INSERT INTO Keywords VALUES (?, ?, ?)"
+        query = "INSERT INTO Keywords (keyword, keyword_count, webpage_ID) VALUES (?, ?, ?)"
         self.execute_write(query, (keyword, count, web_id))
 
     def update_metadata(self, headings, paragraphs, url):
         query = "UPDATE Metadata SET heading=?, paragraph=? WHERE url=?"
-        self.execute_write(query, (headings, paragraphs, url))
\ No newline at end of file
+        self.execute_write(query, (headings, paragraphs, url))
+
+    # --- Link Graph ---
+
+    def get_page_ids(self):
+        """Every web ID, ascending."""
+        return [r[0] for r in self.execute_read('SELECT webpage_ID FROM webpage ORDER BY webpage_ID',
+                                                fetch_all=True)]
+
+    def get_link_rows(self):
+        """(source web ID, packed target url_IDs) for every page with stored links."""
+        return self.execute_read('SELECT source_ID, targets FROM link', fetch_all=True)
+
+    def get_outlinks(self, web_id):
+        """The outbound URLs stored for a page, or [] if none were stored."""
+        row = self.execute_read('SELECT targets FROM link WHERE source_ID=?', (web_id,))
+        if not row:
+            return []
+        query = 'SELECT url FROM link_url WHERE url_ID IN (SELECT value FROM json_each(?)) ORDER BY url_ID'
+        return [r[0] for r in self.execute_read(query, (json.dumps(list(unpack_ids(row[0]))),), fetch_all=True)]
+
+    def get_link_targets(self):
+        """
+        (url_ID, web ID) for every link target that is an indexed page, or a
+        URL skipped as a near-duplicate of one. Also returns the largest url_ID.
+        """
+        query = '''
+            SELECT u.url_ID, w.webpage_ID FROM link_url u JOIN webpage w ON w.url = u.url
+            UNION ALL
+            SELECT u.url_ID, d.webpage_ID FROM link_url u JOIN duplicate d ON d.url = u.url
+        '''
+        max_id = self.execute_read('SELECT COALESCE(MAX(url_ID), 0) FROM link_url')[0]
+        return self.execute_read(query, fetch_all=True), max_id
+
+    def set_authority(self, scores):
+        """
+        Stores (web ID, pagerank, authority) rows from a link-analysis run and
+        re-blends every category ranking with the new authorities.
+        """
+        with self.batch():
+            self.execute_write('UPDATE webpage SET pagerank = NULL, authority = NULL')
+            self.execute_many('UPDATE webpage SET pagerank=?, authority=? WHERE webpage_ID=?',
+                              [(pagerank, authority, web_id) for web_id, pagerank, authority in scores])
+            self.execute_write('''
+                UPDATE category_rank SET blended = score * (1 + ? * COALESCE(
+                    (SELECT authority FROM webpage w WHERE w.webpage_ID = category_rank.webpage_ID), 0))
+            ''', (self.AUTHORITY_WEIGHT,))
+
+    # --- Re-categorization ---
+
+    def get_keyword_counts(self):
+        """(web ID, keyword, count) for every stored keyword hit."""
+        return self.execute_read('SELECT webpage_ID, keyword, keyword_count FROM Keywords WHERE keyword_count > 0',
+                                 fetch_all=True)
+
+    def get_category_counts(self):
+        """(web ID, category, count) for every stored Category row."""
+        return self.execute_read('SELECT webpage_ID, category, category_count FROM Category '
+                                 'WHERE category_count > 0', fetch_all=True)
+
+    def iter_page_bodies(self, batch_size=500):
+        """Yields (web ID, body text) for every page with stored text, in web ID order."""
+        query = 'SELECT webpage_ID, body FROM page_text WHERE webpage_ID > ? ORDER BY webpage_ID LIMIT ?'
+        last_id = 0
+        while True:
+            rows = self.execute_read(query, (last_id, batch_size), fetch_all=True)
+            for web_id, body in rows:
+                yield web_id, unpack_text(body)
+            if len(rows) < batch_size:
+                return
+            last_id = rows[-1][0]
+
+    def replace_keywords(self, keywords):
+        """Replaces the Keywords rows of each page in keywords ({web ID: {keyword: count}})."""
+        with self.batch():
+            self.execute_write('DELETE FROM Keywords WHERE webpage_ID IN (SELECT value FROM json_each(?))',
+                               (json.dumps(list(keywords)),))
+            self.execute_many('INSERT INTO Keywords (keyword, keyword_count, webpage_ID) VALUES (?, ?, ?)',
+                              [(k, c, web_id) for web_id, counts in keywords.items() for k, c in counts.items()])
+
+    def set_categories(self, web_ids, rows, ranks):
+        """
+        Rewrites the categories of the pages in web_ids in one transaction:
+        their Category rows become rows ((category, count, web ID)) and
+        their category_rank rows become ranks ((category, score, web ID)),
+        blended with each page's authority. Pages with no rank in ranks end
+        up with no category_rank row.
+        """
+        ids = json.dumps(list(web_ids))
+        with self.batch():
+            self.execute_write('DELETE FROM Category WHERE webpage_ID IN (SELECT value FROM json_each(?))', (ids,))
+            self.execute_many('INSERT INTO Category (category, category_count, webpage_ID) VALUES (?, ?, ?)',
+                              rows)
+            self.execute_write('DELETE FROM category_rank WHERE webpage_ID IN (SELECT value FROM json_each(?))',
+                               (ids,))
+            self.execute_many(RANK_INSERT, [(category, score, score, self.AUTHORITY_WEIGHT, web_id)
+                                            for category, score, web_id in ranks])
+
+    # --- Crawl State ---
+    # Frontier writes join the open batch() transaction, so they commit
+    # together with the pages that discovered them.
+
+    def create_crawl_job(self, seeds, max_depth, max_pages, refresh, date):
+        """Registers a new resumable crawl and returns its job ID."""
+        query = '''
+            INSERT INTO crawl_job (seeds, max_depth, max_pages, refresh, status, started_at, updated_at)
+            VALUES (?, ?, ?, ?, 'running', ?, ?)
+        '''
+        return self.execute_write(query, (json.dumps(seeds), max_depth, max_pages, int(refresh), date, date))
+
+    def get_crawl_job(self, job_id=None):
+        """
+        Returns a job as a dict, or None. Without job_id, the most recent job
+        that did not finish (still running when the app stopped, or stopped).
+        """
+        columns = ('job_ID, seeds, max_depth, max_pages, refresh, status, fetched, indexed, errors, unchanged, '
+                   'duplicates')
+        if job_id is None:
+            row = self.execute_read(f"SELECT {columns} FROM crawl_job WHERE status IN ('running', 'stopped') "
+                                    "ORDER BY job_ID DESC LIMIT 1")
+        else:
+            row = self.execute_read(f'SELECT {columns} FROM crawl_job WHERE job_ID=?', (job_id,))
+        if not row:
+            return None
+        job = dict(zip(columns.split(', '), row))
+        job['seeds'] = json.loads(job['seeds'])
+        job['refresh'] = bool(job['refresh'])
+        return job
+
+    def get_frontier(self, job_id):
+        """Every URL of a job as (url, depth, retries, status), in crawl order."""
+        query = '''
+            SELECT url, depth, retries, status FROM crawl_frontier
+            WHERE job_ID=?
+            ORDER BY depth, seq
+        '''
+        return self.execute_read(query, (job_id,), fetch_all=True)
+
+    def add_frontier_urls(self, job_id, urls):
+        """Queues (url, depth) pairs for a job; URLs it already has are ignored."""
+        query = "INSERT OR IGNORE INTO crawl_frontier (job_ID, url, depth) VALUES (?, ?, ?)"
+        self.execute_many(query, [(job_id, url, depth) for url, depth in urls])
+
+    def set_frontier_status(self, job_id, url, status, retries=None):
+        query = "UPDATE crawl_frontier SET status=?, retries=COALESCE(?, retries) WHERE job_ID=? AND url=?"
+        self.execute_write(query, (status, retries, job_id, url))
+
+    def get_host_state(self, job_id):
+        """Per-host politeness state as {host: (next_allowed, delay)}; times are Unix time."""
+        query = 'SELECT host, next_allowed, delay FROM crawl_host WHERE job_ID=?'
+        return {host: (next_allowed, delay)
+                for host, next_allowed, delay in self.execute_read(query, (job_id,), fetch_all=True)}
+
+    def save_crawl_checkpoint(self, job_id, status, stats, hosts, date):
+        """Stores a job's counters, status and per-host state."""
+        with self.batch():
+            self.execute_write('''UPDATE crawl_job SET status=?, fetched=?, indexed=?, errors=?, unchanged=?,
+                                  duplicates=?, updated_at=? WHERE job_ID=?''',
+                               (status, stats['fetched'], stats['indexed'], stats['errors'], stats['unchanged'],
+                                stats['duplicates'], date, job_id))
+            self.execute_many('''INSERT OR REPLACE INTO crawl_host (job_ID, host, next_allowed, delay)
+                                 VALUES (?, ?, ?, ?)''',
+                              [(job_id, host, next_allowed, delay) for host, (next_allowed, delay) in hosts.items()])
@@ -0,0 +1,49 @@
+import json
+import sys
+from src.urls import canonicalize
+
+def write_text(f, url, summary, text=None):
+    """Writes one page as plain text: URL, summary, then its headings and full text if stored."""
+    f.write(f"URL: {url}\n\n")
+    f.write(f"SUMMARY:\n{summary}")
+    if text:
+        f.write(f"\n\nHEADINGS:\n{text[0]}\n\nTEXT:\n{text[1]}")
+
+def write_json(f, url, summary, category=None, text=None):
+    """Writes one page as a JSON line."""
+    record = {'url': url, 'summary': summary, 'category': category,
+              'headings': text[0] if text else '', 'text': text[1] if text else ''}
+    f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+def _pages(db, urls, category):
+    if urls is None:
+        for url, summary, page_category, headings, body in db.iter_pages(category):
+            yield url, summary, page_category, (headings, body)
+        return
+    for url in urls:
+        url = canonicalize(url) or url
+        page = db.get_page(url)
+        if page is None:
+            print(f"Not indexed: {url}", file=sys.stderr)
+            continue
+        yield url, page['summary'], page['category'], db.get_page_text(url)
+
+def export_pages(db, f, urls=None, category=None, fmt='text'):
+    """
+    Streams pages to the open file f, one at a time: the given urls, or
+    every indexed page (optionally only one primary category). fmt is
+    'text' (save-to-text blocks separated by form feeds) or 'jsonl'.
+    Returns the number of pages written.
+    """
+    written = 0
+    for url, summary, page_category, text in _pages(db, urls, category):
+        if fmt == 'jsonl':
+            write_json(f, url, summary, page_category, text)
+        else:
+            if written:
+                f.write("\n\f\n")
+            write_text(f, url, summary, text)
+        written += 1
+    if fmt != 'jsonl' and written:
+        f.write("\n")
+    return written
@@ -0,0 +1,533 @@
+import http.client
+import socket
+import ssl
+import threading
+import time
+import urllib.robotparser
+import zlib
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit, urljoin
+
+USER_AGENT = 'Mozilla/5.0'
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+RETRY_CODES = (429, 503)
+
+# Bodies are read in pieces of this size and never kept past MAX_BODY_BYTES
+CHUNK_SIZE = 64 * 1024
+MAX_BODY_BYTES = 5 * 2**20
+# A body still downloading after this many seconds is abandoned
+MAX_FETCH_SECONDS = 60
+# Longest a host may make us wait (Retry-After, Crawl-delay); a host asking
+# for more is given up on for the rest of the crawl instead
+MAX_RETRY_AFTER = 60
+# Content types worth downloading for the parser; PDFs, images, video etc. are skipped
+HTML_TYPES = ('text/html', 'application/xhtml+xml')
+
+def header_charset(headers):
+    content_type = headers.get('content-type', '')
+    for part in content_type.split(';')[1:]:
+        key, _, value = part.strip().partition('=')
+        if key.lower() == 'charset' and value:
+            return value.strip('"\'')
+    return None
+
+def retry_after(headers, default):
+    """Seconds to wait from a Retry-After header (delay or HTTP date), else default."""
+    value = headers.get('retry-after', '').strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return default
+
+def skip_reason(status, headers, max_bytes=MAX_BODY_BYTES, accept_types=HTML_TYPES):
+    """
+    Why a response isn't worth downloading, judged from its headers alone:
+    a successful response of the wrong content type, or a Content-Length
+    over max_bytes. None means read it.
+    """
+    if accept_types and 200 <= status < 300:
+        content_type = headers.get('content-type', '').split(';')[0].strip().lower()
+        if content_type and content_type not in accept_types:
+            return f"content-type {content_type}"
+    length = headers.get('content-length', '')
+    if max_bytes and length.isdigit() and int(length) > max_bytes:
+        return f"{length} bytes, over the {max_bytes} byte limit"
+    return None
+
+def read_body(resp, encoding=None, max_bytes=MAX_BODY_BYTES, deadline=None, on_chunk=None, sock=None):
+    """
+    Reads a response body up to CHUNK_SIZE bytes at a time, gunzipping as
+    it goes, and passes each decoded chunk to on_chunk. Stops after
+    max_bytes of decoded body (so a gzip bomb can't expand past it either)
+    and raises TimeoutError once time.monotonic() passes deadline.
+    Each read returns whatever has arrived, so a trickling body still hits
+    the deadline; given the response's socket, no single read may wait
+    past it either.
+    Returns (body, truncated).
+    """
+    decoder = zlib.decompressobj(16 + zlib.MAX_WBITS) if encoding == 'gzip' else None
+    read = getattr(resp, 'read1', resp.read)
+    read_timeout = sock.gettimeout() if sock is not None else None
+    chunks = []
+    size = 0
+    truncated = False
+    try:
+        while not truncated:
+            raw = _read_chunk(read, deadline, sock, read_timeout, size)
+            if not raw:
+                data = decoder.flush() if decoder else b''
+            elif decoder:
+                # Ask for one byte more than the budget to notice going over it
+                data = decoder.decompress(raw, max_bytes - size + 1)
+            else:
+                data = raw
+            if size + len(data) > max_bytes:
+                data = data[:max_bytes - size]
+                truncated = True
+            if data:
+                chunks.append(data)
+                size += len(data)
+                if on_chunk is not None:
+                    on_chunk(data)
+            if not raw:
+                # read1() never marks a response with a Content-Length finished;
+                # read() at the end does, so http.client can reuse the connection
+                resp.read()
+                break
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError(f"body still downloading after {size} bytes")
+    finally:
+        # http.client closes the socket itself once a Connection: close response is read
+        if sock is not None and sock.fileno() != -1:
+            sock.settimeout(read_timeout)
+    return b''.join(chunks), truncated
+
+def _read_chunk(read, deadline, sock, read_timeout, size):
+    if sock is not None and deadline is not None and sock.fileno() != -1:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f"body still downloading after {size} bytes")
+        sock.settimeout(remaining if read_timeout is None else min(read_timeout, remaining))
+    try:
+        return read(CHUNK_SIZE)
+    except socket.timeout:
+        if deadline is not None and time.monotonic() >= deadline:
+            raise TimeoutError(f"body still downloading after {size} bytes") from None
+        raise
+
+class Response:
+    """
+    Result of a single fetch. skipped holds the reason a body was not
+    downloaded (see skip_reason); truncated is set when it was cut off at
+    the size limit.
+    """
+    def __init__(self, url, status, headers, body, skipped=None, truncated=False):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.skipped = skipped
+        self.truncated = truncated
+
+    @property
+    def charset(self):
+        return header_charset(self.headers)
+
+class ConnectionPool:
+    """
+    Keeps idle keep-alive connections per (scheme, host, port) so repeated
+    requests to the same host skip the TCP and TLS handshakes.
+    New connections are opened here, one step at a time, so DNS, TCP
+    connect and the TLS handshake can each be timed into metrics and
+    connecting gets its own timeout; timeout then bounds every read.
+    """
+    def __init__(self, ctx=None, timeout=15, max_idle_per_host=4, metrics=None, connect_timeout=10):
+        self.ctx = ctx
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_idle_per_host = max_idle_per_host
+        self.metrics = metrics
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, scheme, netloc):
+        key = (scheme, netloc)
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return key, idle.pop()
+        if scheme == 'https':
+            conn = http.client.HTTPSConnection(netloc, timeout=self.timeout, context=self.ctx)
+        else:
+            conn = http.client.HTTPConnection(netloc, timeout=self.timeout)
+        self._open(conn, scheme == 'https')
+        return key, conn
+
+    def _observe(self, stage, seconds):
+        if self.metrics is not None:
+            self.metrics.observe_stage(stage, seconds)
+
+    def _open(self, conn, tls):
+        """Connects conn in timed steps; http.client then uses the socket as-is."""
+        start = time.perf_counter()
+        addresses = socket.getaddrinfo(conn.host, conn.port, type=socket.SOCK_STREAM)
+        connected = time.perf_counter()
+        self._observe('dns', connected - start)
+
+        error = None
+        for family, socktype, proto, _, address in addresses:
+            sock = socket.socket(family, socktype, proto)
+            sock.settimeout(self.connect_timeout)
+            try:
+                sock.connect(address)
+                break
+            except OSError as e:
+                sock.close()
+                error = e
+        else:
+            raise error or OSError(f"Could not resolve {conn.host}")
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        start, connected = connected, time.perf_counter()
+        self._observe('connect', connected - start)
+
+        if tls:
+            try:
+                sock = self.ctx.wrap_socket(sock, server_hostname=conn.host)
+            except Exception:
+                sock.close()
+                raise
+            self._observe('tls', time.perf_counter() - connected)
+        sock.settimeout(self.timeout)
+        conn.sock = sock
+
+    def release(self, key, conn, reusable=True):
+        """Returns a connection to the pool, or closes it if it can't be reused."""
+        if reusable:
+            with self._lock:
+                idle = self._idle.setdefault(key, [])
+                if len(idle) < self.max_idle_per_host:
+                    idle.append(conn)
+                    return
+        conn.close()
+
+    def close_all(self):
+        with self._lock:
+            for idle in self._idle.values():
+                for conn in idle:
+                    conn.close()
+            self._idle.clear()
+
+class HostScheduler:
+    """
+    Per-host politeness: caps concurrent requests to a host and spaces them
+    at least `delay` seconds apart. Hosts that answer 429/503 are backed off.
+    No host's delay or backoff exceeds max_wait seconds, so a fetch thread
+    never sleeps longer than that before its request.
+    """
+    def __init__(self, concurrency=2, delay=0.5, max_wait=MAX_RETRY_AFTER):
+        self.concurrency = concurrency
+        self.delay = delay
+        self.max_wait = max_wait
+        self._active = {}
+        self._next_allowed = {}
+        self._delays = {}
+        self._cond = threading.Condition()
+
+    def available(self, host):
+        """True if a request to this host could start without queueing for a slot."""
+        with self._cond:
+            return self._active.get(host, 0) < self.concurrency
+
+    def set_delay(self, host, delay):
+        with self._cond:
+            self._delays[host] = min(max(self.delay, delay), self.max_wait)
+
+    def backoff(self, host, seconds):
+        with self._cond:
+            until = time.monotonic() + min(seconds, self.max_wait)
+            self._next_allowed[host] = max(self._next_allowed.get(host, 0), until)
+
+    def export_state(self):
+        """
+        Snapshot of per-host timing as {host: (next_allowed, delay)}, with
+        next_allowed in Unix time so it stays meaningful after a restart.
+        """
+        with self._cond:
+            offset = time.time() - time.monotonic()
+            hosts = set(self._next_allowed) | set(self._delays)
+            return {host: (self._next_allowed.get(host, 0) + offset if host in self._next_allowed else None,
+                           self._delays.get(host))
+                    for host in hosts}
+
+    def restore_state(self, hosts):
+        """
+        Loads a snapshot from export_state(), e.g. when resuming a crawl.
+        Waits are cut to max_wait, as the snapshot may predate the limit.
+        """
+        with self._cond:
+            offset = time.time() - time.monotonic()
+            latest = time.monotonic() + self.max_wait
+            for host, (next_allowed, delay) in hosts.items():
+                if next_allowed is not None:
+                    until = min(next_allowed - offset, latest)
+                    self._next_allowed[host] = max(self._next_allowed.get(host, 0), until)
+                if delay is not None:
+                    self._delays[host] = min(delay, self.max_wait)
+
+    @contextmanager
+    def slot(self, host):
+        with self._cond:
+            while self._active.get(host, 0) >= self.concurrency:
+                self._cond.wait()
+            self._active[host] = self._active.get(host, 0) + 1
+            # Reserve the next start time before sleeping so parallel slots stay spaced
+            now = time.monotonic()
+            start = max(now, self._next_allowed.get(host, 0))
+            self._next_allowed[host] = start + self._delays.get(host, self.delay)
+        try:
+            if start > now:
+                time.sleep(start - now)
+            yield
+        finally:
+            with self._cond:
+                self._active[host] -= 1
+                self._cond.notify_all()
+
+class Fetcher:
+    """
+    Shared fetch layer for the crawler: keep-alive connection pooling,
+    per-host scheduling, cached robots.txt and Retry-After handling. A host
+    whose Retry-After exceeds max_retry_after seconds is not waited for: its
+    response is returned, and later requests to it fail at once with the
+    same status for the rest of this Fetcher's life.
+    With metrics (see src/metrics.py), records DNS/connect/TLS/wait/transfer
+    times, response codes and per-host request and error counts.
+    Bodies are streamed in chunks: responses of other content types than
+    accept_types, or announced as larger than max_bytes, are skipped before
+    download; longer streams are cut off at max_bytes, and a body still
+    arriving after max_time seconds is abandoned. timeout bounds each read,
+    connect_timeout the TCP connect.
+    """
+    def __init__(self, concurrency_per_host=2, delay_per_host=0.5, timeout=15,
+                 respect_robots=True, max_redirects=5, max_retries=2, verify_ssl=False, cache=None,
+                 metrics=None, connect_timeout=10, max_bytes=MAX_BODY_BYTES, max_time=MAX_FETCH_SECONDS,
+                 accept_types=HTML_TYPES, max_retry_after=MAX_RETRY_AFTER):
+        # Bypass SSL verification for educational scraping
+        ctx = ssl.create_default_context()
+        if not verify_ssl:
+            ctx.check_hostname = False
+            ctx.verify_mode = ssl.CERT_NONE
+
+        self.pool = ConnectionPool(ctx, timeout=timeout, max_idle_per_host=concurrency_per_host, metrics=metrics,
+                                   connect_timeout=connect_timeout)
+        self.scheduler = HostScheduler(concurrency_per_host, delay_per_host, max_retry_after)
+        # {host: status} for hosts that asked to be left alone longer than max_retry_after
+        self._gave_up = {}
+        self.respect_robots = respect_robots
+        self.max_redirects = max_redirects
+        self.max_retries = max_retries
+        self.max_bytes = max_bytes
+        self.max_time = max_time
+        self.accept_types = accept_types
+        # Optional ResponseCache (see src/cache.py); fresh entries skip the network
+        self.cache = cache
+        self.metrics = metrics
+
+        self._robots = {}
+        self._robots_lock = threading.Lock()
+
+    def _request(self, url, headers=None, accept_types=None, on_chunk=None):
+        """
+        Performs one GET on a pooled connection, streaming the body (see the
+        class docstring); on_chunk gets each piece of a 2xx body as it
+        arrives, along with the response headers and url. Retries once on a stale keep-alive socket.
+        """
+        parts = urlsplit(url)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        request_headers = {
+            'User-Agent': USER_AGENT,
+            'Accept-Encoding': 'gzip',
+            'Connection': 'keep-alive',
+        }
+        if accept_types:
+            request_headers['Accept'] = ', '.join(accept_types) + ';q=1.0, */*;q=0.1'
+        request_headers.update(headers or {})
+
+        for attempt in range(2):
+            key, conn = self.pool.acquire(parts.scheme, parts.netloc)
+            delivered = []
+            try:
+                start = time.perf_counter()
+                conn.request('GET', path, headers=request_headers)
+                # http.client drops conn.sock for responses that close the connection
+                sock = conn.sock
+                resp = conn.getresponse()
+                first_byte = time.perf_counter()
+                response_headers = {k.lower(): v for k, v in resp.getheaders()}
+
+                skipped = skip_reason(resp.status, response_headers, self.max_bytes, accept_types)
+                if skipped:
+                    # Don't download it; the unread body makes the connection unusable
+                    conn.close()
+                    if self.metrics is not None:
+                        self.metrics.inc('fetch_skipped',
+                                         reason='type' if skipped.startswith('content-type') else 'size')
+                    return Response(url, resp.status, response_headers, b'', skipped=skipped)
+
+                def feed(chunk):
+                    delivered.append(len(chunk))
+                    on_chunk(chunk, response_headers, url)
+                stream = feed if on_chunk is not None and 200 <= resp.status < 300 else None
+                body, truncated = read_body(resp, response_headers.get('content-encoding'), self.max_bytes,
+                                            time.monotonic() + self.max_time if self.max_time else None, stream,
+                                            sock)
+                if self.metrics is not None:
+                    # wait: request sent until headers arrive; transfer: reading the body
+                    self.metrics.observe_stage('wait', first_byte - start)
+                    self.metrics.observe_stage('transfer', time.perf_counter() - first_byte)
+                    self.metrics.inc('fetch_bytes', len(body))
+                    if truncated:
+                        self.metrics.inc('fetch_truncated')
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                # The server closed an idle keep-alive connection; open a fresh one,
+                # unless part of the body already went to on_chunk
+                conn.close()
+                if attempt or delivered:
+                    raise
+                continue
+            except Exception:
+                conn.close()
+                raise
+            # A truncated body leaves unread bytes on the socket
+            self.pool.release(key, conn, reusable=not (resp.will_close or truncated))
+            return Response(url, resp.status, response_headers, body, truncated=truncated)
+
+    def robots(self, scheme, netloc):
+        """Returns the cached robots.txt parser for a host, fetching it on first use."""
+        key = (scheme, netloc)
+        with self._robots_lock:
+            if key in self._robots:
+                return self._robots[key]
+
+        parser = urllib.robotparser.RobotFileParser()
+        try:
+            url = f"{scheme}://{netloc}/robots.txt"
+            for _ in range(self.max_redirects + 1):
+                resp = self._request(url)
+                if resp.status not in REDIRECT_CODES or 'location' not in resp.headers:
+                    break
+                url = urljoin(url, resp.headers['location'])
+            if resp.status in (401, 403):
+                parser.disallow_all = True
+            elif 200 <= resp.status < 300:
+                parser.parse(resp.body.decode('utf-8', 'replace').splitlines())
+            else:
+                # Missing, or still redirecting after max_redirects: unavailable
+                parser.allow_all = True
+        except Exception:
+            parser.allow_all = True
+
+        delay = parser.crawl_delay(USER_AGENT)
+        if delay:
+            self.scheduler.set_delay(netloc, float(delay))
+
+        with self._robots_lock:
+            self._robots[key] = parser
+        return parser
+
+    def allowed(self, url):
+        if not self.respect_robots:
+            return True
+        parts = urlsplit(url)
+        return self.robots(parts.scheme, parts.netloc).can_fetch(USER_AGENT, url)
+
+    def host_available(self, url):
+        return self.scheduler.available(urlsplit(url).netloc)
+
+    def fetch(self, url, headers=None, on_chunk=None, refresh=False):
+        """
+        Fetches a URL politely, following redirects, through the response
+        cache when one is configured. A refresh, or a conditional request
+        (If-None-Match / If-Modified-Since), always asks the server and
+        only updates the cache. With on_chunk, pieces of the final page
+        body are passed to on_chunk(chunk, headers, url) as they download
+        (not for cache hits), url being the one the body comes from.
+        response.url is likewise the URL after any redirects.
+        Returns a Response, or None if robots.txt disallows it. Check
+        response.skipped for bodies that were not downloaded.
+        """
+        conditional = any(k.lower() in ('if-none-match', 'if-modified-since') for k in headers or {})
+        if self.cache is not None and not (refresh or conditional):
+            cached = self.cache.get(url)
+            if cached is not None:
+                if self.metrics is not None:
+                    self.metrics.inc('cache_hits')
+                return cached
+
+        resp = self._fetch_network(url, headers, on_chunk)
+        if self.cache is not None and resp is not None:
+            if resp.status == 200 and not (resp.skipped or resp.truncated):
+                # Cache under the requested URL so later lookups hit; the entry keeps resp.url
+                self.cache.put(resp, url)
+            elif resp.status == 304:
+                self.cache.touch(url)
+        return resp
+
+    def _fetch_network(self, url, headers=None, on_chunk=None):
+        retries = 0
+        for _ in range(self.max_redirects + 1):
+            host = urlsplit(url).netloc
+            if host in self._gave_up:
+                return Response(url, self._gave_up[host], {}, b'')
+            if not self.allowed(url):
+                print(f"Blocked by robots.txt: {url}")
+                return None
+
+            with self.scheduler.slot(host):
+                try:
+                    resp = self._request(url, headers, self.accept_types, on_chunk)
+                except Exception:
+                    self._count(host, None)
+                    raise
+            self._count(host, resp.status)
+
+            if resp.status in REDIRECT_CODES and 'location' in resp.headers:
+                url = urljoin(url, resp.headers['location'])
+                continue
+
+            if resp.status in RETRY_CODES and retries < self.max_retries:
+                wait = retry_after(resp.headers, 2 ** (retries + 1))
+                if wait > self.scheduler.max_wait:
+                    # Sleeping that long would stall a fetch thread past any cancel
+                    print(f"Giving up on {host} for now: asked to wait {wait:.0f}s")
+                    self._gave_up[host] = resp.status
+                    return resp
+                retries += 1
+                self.scheduler.backoff(host, wait)
+                continue
+
+            return resp
+        return resp
+
+    def use_metrics(self, metrics):
+        """Starts recording into metrics (also used by the connection pool)."""
+        self.metrics = self.pool.metrics = metrics
+
+    def _count(self, host, status):
+        """Per-host request/error counters; status None means the request itself failed."""
+        if self.metrics is None:
+            return
+        self.metrics.inc('fetch_requests', host=host)
+        if status is None or status >= 400:
+            self.metrics.inc('fetch_errors', host=host)
+        self.metrics.inc('http_responses', status=status or 'error')
+
+    def close(self):
+        self.pool.close_all()
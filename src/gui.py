@@ -1,15 +1,27 @@
 import customtkinter as ctk
 import os
+import sqlite3
 import webbrowser
 from PIL import Image
 from src.database import DatabaseManager
 from src.scraper import Scraper
+from src.search import SearchEngine
+from src.worker import TaskRunner, CrawlJob
+from src.cache import ResponseCache
+from src.export import write_text
+from src.linkrank import rank_pages
+from src.urls import canonicalize
 
 # Configuration
 FONT_TITLE = ('avenir', 18)
 FONT_HEADER = ('hiragino sans', 30)
 THEME_COLOR = '#47E5E5'
 HOVER_COLOR = '#2443F0'
+RESULTS_PER_PAGE = 5
+POLL_MS = 100
+PARSE_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+# Crawl metrics in Prometheus text format, rewritten every 10 s during a crawl
+METRICS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'metrics.prom')
 
 class LinkSurferGUI(ctk.CTk):
     def __init__(self):
@@ -20,6 +32,14 @@ class LinkSurferGUI(ctk.CTk):
         
         # Initialize Backend
         self.db = DatabaseManager()
+        self.search_engine = SearchEngine(self.db)
+
+        # Background work: crawls, lookups and DB reads never run on the Tk thread
+        self.runner = TaskRunner()
+        self.crawl_job = None
+        self._build_status_bar()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.after(POLL_MS, self.poll_background)
         
         # Setup Directories
         self.base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -34,6 +54,59 @@ class LinkSurferGUI(ctk.CTk):
         """Removes all widgets from the current view."""
         for widget in self.winfo_children():
             widget.place_forget()
+        self._place_status_bar()
+
+    # --- Status Bar ---
+
+    def _build_status_bar(self):
+        self.status_var = ctk.StringVar(value="Idle")
+        self.status_label = ctk.CTkLabel(self, textvariable=self.status_var, font=("Arial", 14))
+        # Live per-stage latencies and failing hosts while a crawl runs
+        self.metrics_var = ctk.StringVar(value="")
+        self.metrics_label = ctk.CTkLabel(self, textvariable=self.metrics_var, font=("Arial", 11))
+        self.btn_pause = ctk.CTkButton(self, text="Pause", command=self.on_toggle_pause, width=100,
+                                       fg_color=THEME_COLOR, text_color="black", hover_color=HOVER_COLOR)
+        self.btn_cancel = ctk.CTkButton(self, text="Cancel", command=self.on_cancel_crawl, width=100,
+                                        fg_color=THEME_COLOR, text_color="black", hover_color=HOVER_COLOR)
+
+    def _place_status_bar(self):
+        self.status_label.place(relx=0.05, rely=0.93)
+        self.metrics_label.place(relx=0.05, rely=0.965)
+        if self.crawl_job and self.crawl_job.running:
+            self.btn_pause.place(relx=0.78, rely=0.935)
+            self.btn_cancel.place(relx=0.86, rely=0.935)
+        else:
+            self.btn_pause.place_forget()
+            self.btn_cancel.place_forget()
+
+    def set_status(self, text):
+        self.status_var.set(text)
+
+    def show_error(self, error):
+        print(f"Error: {error}")
+        self.set_status(f"Error: {error}")
+
+    def poll_background(self):
+        """Applies results and progress posted by background threads."""
+        latest_progress = None
+        for message in self.runner.drain():
+            kind = message[0]
+            if kind == 'done':
+                _, callback, result = message
+                if callback:
+                    callback(result)
+            elif kind == 'error':
+                _, callback, error = message
+                (callback or self.show_error)(error)
+            elif kind == 'crawl_progress':
+                latest_progress = message[1]
+            elif kind == 'crawl_done':
+                latest_progress = None
+                self.on_crawl_done(message[1])
+
+        if latest_progress:
+            self.show_crawl_progress(latest_progress)
+        self.after(POLL_MS, self.poll_background)
 
     # --- Pages ---
 
@@ -51,7 +124,7 @@ class LinkSurferGUI(ctk.CTk):
             ctk.CTkLabel(self, text="LinkSurfer", font=("Arial", 60)).place(relx=0.4, rely=0.2)
 
         # Search Bar
-        self.search_entry = ctk.CTkEntry(self, placeholder_text='Enter URL...', font=FONT_HEADER, width=400)
+        self.search_entry = ctk.CTkEntry(self, placeholder_text='Enter URL or keywords...', font=FONT_HEADER, width=400)
         self.search_entry.place(relx=0.35, rely=0.55, relheight=0.08, relwidth=0.3)
 
         # Search Button
@@ -64,16 +137,21 @@ class LinkSurferGUI(ctk.CTk):
                                   font=(FONT_TITLE[0], 45), hover_color=HOVER_COLOR, command=self.on_manual_index)
         btn_index.place(relx=0.35, rely=0.65, relheight=0.1, relwidth=0.35)
 
-        # Recents Dropdown
-        recents_data = self.db.get_recent_files()
-        recent_urls = [r[0] for r in recents_data] if recents_data else ["No History"]
-        
+        # Recents Dropdown, filled in once the query returns
         self.dropdown_var = ctk.StringVar(value='Recently Indexed')
-        dropdown = ctk.CTkOptionMenu(self, variable=self.dropdown_var, values=recent_urls, 
+        dropdown = ctk.CTkOptionMenu(self, variable=self.dropdown_var, values=["Loading..."], 
                                      command=self.open_recent, width=200, height=50, fg_color=THEME_COLOR, text_color='black')
         dropdown.place(relx=0.1, rely=0.18)
+        self.runner.submit(self.db.get_recent_files, on_done=lambda rows: self._fill_recents(dropdown, rows),
+                           on_error=self._query_failed)
+
+    def _fill_recents(self, dropdown, recents_data):
+        if not dropdown.winfo_exists():
+            return
+        recent_urls = [r[0] for r in recents_data] if recents_data else ["No History"]
+        dropdown.configure(values=recent_urls)
 
-    def show_results_page(self, query_url, results):
+    def show_results_page(self, query_url, results, page=None):
         self.clear_frame()
         
         # Main Menu Button
@@ -87,7 +165,8 @@ class LinkSurferGUI(ctk.CTk):
         # List Results (Dynamic generation instead of hardcoded 1-5)
         start_y = 0.3
         if not results:
-            ctk.CTkLabel(self, text="No related pages found in this category.", font=FONT_TITLE).place(relx=0.35, rely=0.3)
+            message = "No matching pages found." if page else "No related pages found in this category."
+            ctk.CTkLabel(self, text=message, font=FONT_TITLE).place(relx=0.35, rely=0.3)
             return
 
         for i, res in enumerate(results[:5]): # Limit to top 5
@@ -97,12 +176,31 @@ class LinkSurferGUI(ctk.CTk):
                                 width=600, height=60, fg_color=THEME_COLOR, text_color='black', font=FONT_TITLE)
             btn.place(relx=0.3, rely=start_y + (i * 0.1))
 
+        # Pagination for keyword searches
+        if page:
+            if page > 1:
+                btn_prev = ctk.CTkButton(self, text="< Prev", command=lambda: self.run_keyword_search(query_url, page - 1),
+                                         width=150, height=50, fg_color=THEME_COLOR, text_color="black")
+                btn_prev.place(relx=0.3, rely=0.82)
+            if len(results) >= RESULTS_PER_PAGE:
+                btn_next = ctk.CTkButton(self, text="Next >", command=lambda: self.run_keyword_search(query_url, page + 1),
+                                         width=150, height=50, fg_color=THEME_COLOR, text_color="black")
+                btn_next.place(relx=0.6, rely=0.82)
+
     def show_summary_page(self, url):
+        # One cached query for the whole screen, run off the Tk thread
+        self.set_status(f"Loading {url}...")
+        self.runner.submit(lambda: self.db.get_page(url), on_done=lambda page: self._show_summary(url, page),
+                           on_error=self._query_failed)
+
+    def _show_summary(self, url, page):
+        if not (self.crawl_job and self.crawl_job.running):
+            self.set_status("Idle")
         self.clear_frame()
         self.selected_url = url
-        
-        summary_text = self.db.get_summary(url)
-        keywords = self.db.get_keywords(url)
+
+        page = page or {'summary': "No summary available.", 'keywords': []}
+        summary_text, keywords = page['summary'], page['keywords']
         
         # Header
         btn_menu = ctk.CTkButton(self, text="< Back", command=self.show_home_page, 
@@ -115,6 +213,10 @@ class LinkSurferGUI(ctk.CTk):
         summary_frame = ctk.CTkScrollableFrame(self, width=500, height=400, label_text="Summary")
         summary_frame.place(relx=0.1, rely=0.2)
         ctk.CTkLabel(summary_frame, text=summary_text, wraplength=480, font=("Arial", 16)).pack(pady=10, padx=10)
+        # The full text is stored compressed; only load it when asked for
+        btn_full = ctk.CTkButton(summary_frame, text="Show Full Text", fg_color=THEME_COLOR, text_color="black",
+                                 command=lambda: self.show_full_text(summary_frame, btn_full))
+        btn_full.pack(pady=10)
 
         # Keywords Section
         keyword_frame = ctk.CTkScrollableFrame(self, width=400, height=400, label_text="Top Keywords")
@@ -129,39 +231,144 @@ class LinkSurferGUI(ctk.CTk):
         btn_save = ctk.CTkButton(self, text="Save to Text File", command=self.save_to_text, width=300, height=50, fg_color=THEME_COLOR, text_color="black")
         btn_save.place(relx=0.5, rely=0.7)
 
+    def show_full_text(self, frame, button):
+        button.configure(state="disabled", text="Loading...")
+        url = self.selected_url
+        self.runner.submit(lambda: self.db.get_page_text(url),
+                           on_done=lambda text: self._show_full_text(frame, button, text),
+                           on_error=self._query_failed)
+
+    def _show_full_text(self, frame, button, text):
+        if not frame.winfo_exists():
+            return
+        button.destroy()
+        body = text[1] if text and text[1] else "No stored text for this page."
+        ctk.CTkLabel(frame, text=body, wraplength=480, justify="left", font=("Arial", 14)).pack(pady=10, padx=10)
+
     # --- Logic Handlers ---
 
     def on_search(self):
-        url = self.search_entry.get()
+        url = self.search_entry.get().strip()
         if not url: return
-        
-        # 1. Check if we know this URL
-        if not self.db.check_link_exists(url):
-            # It's new, let's scrape it first
-            print("URL not found in DB. Scraping now...")
-            scraper = Scraper(url, recursive=False)
-            scraper.run()
-        
-        # 2. Get the primary category of this URL
-        categories = self.db.get_categories_by_url(url)
-        if categories:
-            primary_cat = categories[0][0]
-            # 3. Find other URLs in this category
-            results = self.db.get_urls_by_category(primary_cat)
-            self.show_results_page(url, results)
+
+        # Anything that isn't a URL is a keyword query
+        if "://" not in url:
+            self.run_keyword_search(url)
+            return
+
+        def lookup():
+            # 1. Check if we know this URL (or a near-duplicate of it)
+            page_url = canonicalize(url) or url
+            page_url = self.db.get_duplicate_of(page_url) or page_url
+            if not self.db.check_link_exists(page_url):
+                # It's new, let's scrape it first
+                print("URL not found in DB. Scraping now...")
+                Scraper(page_url, recursive=False, db=self.db).run()
+
+            # 2. Find the top pages in this URL's primary category
+            return self.db.get_related_urls(page_url, limit=5)
+
+        self.set_status(f"Looking up {url}...")
+        self.runner.submit(lookup, on_done=lambda results: self._show_lookup(url, results),
+                           on_error=self._query_failed)
+
+    def _query_failed(self, error):
+        if isinstance(error, sqlite3.OperationalError) and 'locked' in str(error):
+            # Another crawl or background job held the write lock past the busy timeout
+            self.show_error("the index is busy with another crawl, try again in a moment")
         else:
-            # Fallback if no categories found
-            self.show_results_page(url, [])
+            self.show_error(error)
+
+    def _show_lookup(self, query, results, page=None):
+        if not (self.crawl_job and self.crawl_job.running):
+            self.set_status("Idle")
+        self.show_results_page(query, results, page=page)
+
+    def run_keyword_search(self, query, page=1):
+        self.set_status(f"Searching for {query}...")
+        self.runner.submit(lambda: self.search_engine.search(query, page=page, per_page=RESULTS_PER_PAGE),
+                           on_done=lambda results: self._show_lookup(query, results, page=page),
+                           on_error=self._query_failed)
 
     def on_manual_index(self):
-        # Starts indexing from a default seed or user input
+        if self.crawl_job and self.crawl_job.running:
+            self.set_status("A crawl is already running.")
+            return
+
+        # Starts indexing from user input; with no input, picks up an
+        # interrupted crawl if there is one, else the default seed
         url = self.search_entry.get()
-        if not url:
-            url = "https://www.bbc.co.uk" # Default seed
-        
-        scraper = Scraper(url, recursive=True)
-        scraper.run()
+        if url:
+            self.start_crawl(url)
+        else:
+            self.runner.submit(self.db.get_crawl_job, on_done=self._resume_or_seed, on_error=self._query_failed)
+
+    def _resume_or_seed(self, job):
+        if job:
+            self.start_crawl(", ".join(job['seeds']), resume_job=job['job_ID'])
+        else:
+            self.start_crawl("https://www.bbc.co.uk") # Default seed
+
+    def start_crawl(self, url, resume_job=None):
+        if self.crawl_job and self.crawl_job.running:
+            return
+        # The crawl writes through the GUI's DB handle, so its writes clear the read cache
+        self.crawl_job = CrawlJob(self.runner, url, resume_job=resume_job, max_depth=2, max_pages=1000,
+                                  db=self.db, cache=ResponseCache(), parse_workers=PARSE_WORKERS, resumable=True,
+                                  metrics_path=METRICS_PATH)
+        self.crawl_job.start()
+        self.btn_pause.configure(text="Pause")
+        self.set_status(f"{'Resuming crawl' if resume_job else 'Crawling'} from {url}...")
+        self._place_status_bar()
+
+    def show_crawl_progress(self, stats):
+        state = "Paused" if self.crawl_job and self.crawl_job.paused else "Crawling"
+        self.set_status(f"{state}: {stats['indexed']} indexed, {stats['fetched']} fetched, "
+                        f"{stats['queued']} queued, {stats['in_flight']} in flight, {stats['errors']} errors")
+        self.show_metrics(stats)
+
+    def show_metrics(self, stats):
+        text = f"p50/p99: {stats['stages']}" if stats['stages'] else ""
+        if stats['error_hosts']:
+            failing = ", ".join(f"{host} {rate:.0%}" for host, (_, _, rate) in stats['error_hosts'])
+            text += f"   errors: {failing}"
+        self.metrics_var.set(text)
+
+    def on_crawl_done(self, stats):
+        self.set_status(f"Crawl finished: {stats['indexed']} indexed, {stats['fetched']} fetched, "
+                        f"{stats['duplicates']} duplicates, {stats['errors']} errors")
+        self.show_metrics(stats)
         print("Manual indexing finished.")
+        self.btn_pause.place_forget()
+        self.btn_cancel.place_forget()
+        if stats['indexed']:
+            # New pages and links: refresh link authority in the background
+            self.runner.submit(lambda: rank_pages(self.db))
+
+    def on_toggle_pause(self):
+        if not self.crawl_job or not self.crawl_job.running:
+            return
+        if self.crawl_job.paused:
+            self.crawl_job.resume()
+            self.btn_pause.configure(text="Pause")
+            self.set_status("Resuming crawl...")
+        else:
+            self.crawl_job.pause()
+            self.btn_pause.configure(text="Resume")
+            self.set_status("Pausing crawl (finishing pages in flight)...")
+
+    def on_cancel_crawl(self):
+        if self.crawl_job and self.crawl_job.running:
+            self.crawl_job.cancel()
+            self.set_status("Cancelling crawl...")
+
+    def on_close(self):
+        if self.crawl_job and self.crawl_job.running:
+            # Let the crawl commit what it has stored before exiting
+            self.crawl_job.cancel()
+            self.crawl_job.join(timeout=5)
+        self.runner.shutdown()
+        self.destroy()
 
     def open_recent(self, choice):
         self.show_summary_page(choice)
@@ -171,15 +378,18 @@ class LinkSurferGUI(ctk.CTk):
 
     def save_to_text(self):
         # Create a safe filename
-        safe_name = self.selected_url.replace("https://", "").replace("http://", "").replace("/", "_") + ".txt"
+        url = self.selected_url
+        safe_name = url.replace("https://", "").replace("http://", "").replace("/", "_") + ".txt"
         path = os.path.join(self.output_dir, safe_name)
-        
-        summary_text = self.db.get_summary(self.selected_url)
-        
-        try:
-            with open(path, "w") as f:
-                f.write(f"URL: {self.selected_url}\n\n")
-                f.write(f"SUMMARY:\n{summary_text}")
+
+        def save():
+            page = self.db.get_page(url)
+            summary_text = page['summary'] if page else "No summary available."
+            text = self.db.get_page_text(url)
+            with open(path, "w", encoding="utf-8") as f:
+                write_text(f, url, summary_text, text)
             print(f"Saved to {path}")
-        except Exception as e:
-            print(f"Error saving file: {e}")
\ No newline at end of file
+            return path
+
+        self.runner.submit(save, on_done=lambda path: self.set_status(f"Saved to {path}"),
+                           on_error=self._query_failed)
\ No newline at end of file
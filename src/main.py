@@ -5,8 +5,12 @@ import os
 # This ensures that 'from src.gui import...' works regardless of where you run the script from
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.gui import LinkSurferGUI
-
 if __name__ == "__main__":
+    # With arguments, run headless (see src/cli.py); the GUI stack is only imported without
+    if len(sys.argv) > 1:
+        from src.cli import main
+        sys.exit(main())
+
+    from src.gui import LinkSurferGUI
     app = LinkSurferGUI()
-    app.mainloop()
\ No newline at end of file
+    app.mainloop()
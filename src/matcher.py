@@ -0,0 +1,96 @@
+import re
+
+# Bump whenever the trie or any other pickled attribute changes shape, so
+# matchers cached by an older version are rebuilt instead of loaded
+FORMAT_VERSION = 1
+
+class KeywordMatcher:
+    """
+    Compiled multi-word keyword matcher.
+    Every dictionary entry is tokenized into a path in a word trie, so page
+    text is matched in one left-to-right pass over its tokens, taking the
+    longest keyword at each position ("Stock market" before "Stock").
+    Matching is case-insensitive except for all-caps acronyms (AD, MP),
+    which would otherwise collide with ordinary words.
+    """
+    TOKEN_RE = re.compile(r"[A-Za-z0-9]+(?:['’\-][A-Za-z0-9]+)*[+#]*")
+    PAREN_RE = re.compile(r'\s*\([^)]*\)')
+
+    def __init__(self, word_dict):
+        self.root = {}
+        self.acronyms = set()
+        self.categories = sorted(set(word_dict.values()))
+
+        for keyword, category in word_dict.items():
+            self._add(keyword, keyword, category)
+            # "Gross Domestic Product (GDP)" is also written without the aside
+            short = self.PAREN_RE.sub('', keyword).strip()
+            if short and short != keyword:
+                self._add(short, keyword, category, override=False)
+
+    def _key_tokens(self, text):
+        tokens = []
+        for tok in self.TOKEN_RE.findall(text.replace('’', "'")):
+            if len(tok) > 1 and tok.isupper():
+                self.acronyms.add(tok)
+                tokens.append(tok)
+            else:
+                tokens.append(tok.lower())
+        return tokens
+
+    def _add(self, phrase, keyword, category, override=True):
+        tokens = self._key_tokens(phrase)
+        if not tokens:
+            return
+        node = self.root
+        for tok in tokens:
+            node = node.setdefault(tok, {})
+        existing = node.get(None)
+        # Several spellings can normalize to one path ("Capital" / "capital");
+        # like the old capitalize() lookup, the capitalized entry wins.
+        if existing and (not override or existing[0] == existing[0].capitalize()):
+            return
+        node[None] = (keyword, category)
+
+    def tokenize(self, text):
+        acronyms = self.acronyms
+        return [tok if tok in acronyms else tok.lower()
+                for tok in self.TOKEN_RE.findall(text.replace('’', "'"))]
+
+    def scan(self, text):
+        """
+        Returns (keyword_counts, category_counts) for a block of text.
+        Keywords are reported under their dictionary spelling.
+        """
+        tokens = self.tokenize(text)
+        root = self.root
+        keyword_counts = {}
+        category_counts = {}
+
+        i = 0
+        n = len(tokens)
+        while i < n:
+            node = root.get(tokens[i])
+            if node is None:
+                i += 1
+                continue
+
+            # Walk as far as the trie allows, remembering the longest keyword
+            match = None
+            j = i
+            while node is not None:
+                j += 1
+                if None in node:
+                    match = (node[None], j)
+                if j == n:
+                    break
+                node = node.get(tokens[j])
+
+            if match is None:
+                i += 1
+                continue
+            (keyword, category), i = match
+            keyword_counts[keyword] = keyword_counts.get(keyword, 0) + 1
+            category_counts[category] = category_counts.get(category, 0) + 1
+
+        return keyword_counts, category_counts
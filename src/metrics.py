@@ -0,0 +1,202 @@
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds in seconds: 0.1 ms doubling up to ~52 s
+BUCKETS = [0.0001 * 2**i for i in range(20)]
+
+class Histogram:
+    """Fixed-bucket latency histogram; percentiles are read off the buckets."""
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th quantile (0 < q <= 1)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return BUCKETS[i] if i < len(BUCKETS) else float('inf')
+        return float('inf')
+
+    def summary(self):
+        return {'count': self.count, 'sum': self.sum, 'p50': self.percentile(0.5),
+                'p90': self.percentile(0.9), 'p99': self.percentile(0.99)}
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _label_text(labels):
+    if not labels:
+        return ''
+    pairs = []
+    for k, v in labels:
+        v = str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{k}="{v}"')
+    return '{' + ','.join(pairs) + '}'
+
+class Metrics:
+    """
+    In-process crawl metrics: counters, gauges and latency histograms, each
+    keyed by a name plus optional labels (stage=, host=, queue=...).
+    Thread-safe; fetch threads, the crawl thread and the UI all share one.
+    Stage latencies go to the 'stage_seconds' histogram, labelled by stage.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self.started = time.time()
+
+    def inc(self, name, amount=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+
+    def observe(self, name, seconds, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def observe_stage(self, stage, seconds):
+        self.observe('stage_seconds', seconds, stage=stage)
+
+    @contextmanager
+    def timer(self, stage):
+        """Times the block into the stage_seconds histogram."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_stage(stage, time.perf_counter() - start)
+
+    # --- Reading ---
+
+    def counter(self, name, **labels):
+        with self._lock:
+            return self._counters.get(_key(name, labels), 0)
+
+    def stages(self):
+        """{stage: histogram summary} for every timed stage."""
+        with self._lock:
+            return {dict(labels)['stage']: h.summary()
+                    for (name, labels), h in self._histograms.items() if name == 'stage_seconds'}
+
+    def host_errors(self):
+        """{host: (errors, requests, error rate)} for hosts with at least one error."""
+        with self._lock:
+            requests = {dict(labels)['host']: n for (name, labels), n in self._counters.items()
+                        if name == 'fetch_requests'}
+            errors = {dict(labels)['host']: n for (name, labels), n in self._counters.items()
+                      if name == 'fetch_errors'}
+        return {host: (n, requests.get(host, n), n / max(requests.get(host, n), 1)) for host, n in errors.items()}
+
+    def snapshot(self):
+        """Everything as a JSON-friendly dict."""
+        with self._lock:
+            return {
+                'time': time.time(),
+                'uptime': time.time() - self.started,
+                'counters': {name + _label_text(labels): n for (name, labels), n in self._counters.items()},
+                'gauges': {name + _label_text(labels): v for (name, labels), v in self._gauges.items()},
+                'histograms': {name + _label_text(labels): h.summary()
+                               for (name, labels), h in self._histograms.items()},
+            }
+
+    def to_prometheus(self, prefix='linksurfer_'):
+        """Renders the Prometheus text exposition format, with a # TYPE line per metric family."""
+        lines = []
+        typed = set()
+        def family(name, kind):
+            # Items are sorted, so each family's series are contiguous
+            line = f"# TYPE {name} {kind}"
+            if line not in typed:
+                typed.add(line)
+                lines.append(line)
+        with self._lock:
+            for (name, labels), n in sorted(self._counters.items()):
+                family(f"{prefix}{name}_total", 'counter')
+                lines.append(f"{prefix}{name}_total{_label_text(labels)} {n}")
+            for (name, labels), v in sorted(self._gauges.items()):
+                family(f"{prefix}{name}", 'gauge')
+                lines.append(f"{prefix}{name}{_label_text(labels)} {v}")
+            for (name, labels), h in sorted(self._histograms.items()):
+                family(f"{prefix}{name}", 'histogram')
+                cumulative = 0
+                for bound, n in zip(BUCKETS + [float('inf')], h.counts):
+                    cumulative += n
+                    le = '+Inf' if bound == float('inf') else f"{bound:g}"
+                    lines.append(f"{prefix}{name}_bucket{_label_text(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{prefix}{name}_sum{_label_text(labels)} {h.sum}")
+                lines.append(f"{prefix}{name}_count{_label_text(labels)} {h.count}")
+        return '\n'.join(lines) + '\n'
+
+    def format_stages(self):
+        """One-line stage summary for a status bar: 'parse 3.2/12.8ms | wait 0.8/6.4ms' (p50/p99)."""
+        parts = []
+        for stage, s in sorted(self.stages().items()):
+            parts.append(f"{stage} {s['p50'] * 1000:.3g}/{s['p99'] * 1000:.3g}ms")
+        return ' | '.join(parts)
+
+class MetricsExporter:
+    """
+    Writes a Metrics snapshot to a file every `interval` seconds from a
+    daemon thread. A path ending in .prom is rewritten atomically in the
+    Prometheus text format (for a node_exporter textfile collector); any
+    other path gets one JSON object appended per line.
+    """
+    def __init__(self, metrics, path, interval=10.0):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def write(self):
+        try:
+            if self.path.endswith('.prom'):
+                tmp = f"{self.path}.tmp"
+                with open(tmp, 'w') as f:
+                    f.write(self.metrics.to_prometheus())
+                os.replace(tmp, self.path)
+            else:
+                with open(self.path, 'a') as f:
+                    f.write(json.dumps(self.metrics.snapshot()) + '\n')
+        except OSError as e:
+            print(f"Error writing metrics to {self.path}: {e}")
+
+    def stop(self):
+        """Stops the thread and writes one final snapshot."""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.write()
@@ -0,0 +1,63 @@
+import multiprocessing
+import os
+import signal
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from src.scraper import KeywordManager, extract_page
+
+def _init_worker():
+    # Ctrl+C reaches the whole process group; the parent decides how to stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+def _parse_job(url, body, charset, base_url=None):
+    # KeywordManager caches the compiled matcher per process, so each
+    # worker loads keywords once and reuses it for every page
+    return extract_page(url, body, charset, KeywordManager(), base_url=base_url)
+
+class ParsePool:
+    """
+    Parse + analyze stage backed by worker processes.
+    The tokenizer and keyword matcher are pure Python and hold the GIL, so
+    they run in separate processes to use every core. max_pending bounds
+    the pages queued or in progress: imap enforces it, and the crawler stops
+    fetching while that many parses are outstanding.
+    """
+    def __init__(self, processes=None, max_pending=None):
+        self.processes = processes or os.cpu_count() or 1
+        self.max_pending = max_pending or self.processes * 2
+        # spawn: forking a process that runs fetch threads can copy held locks
+        self._executor = ProcessPoolExecutor(max_workers=self.processes,
+                                             mp_context=multiprocessing.get_context('spawn'),
+                                             initializer=_init_worker)
+
+    def submit(self, url, body, charset=None, base_url=None):
+        """
+        Queues one page; the future resolves to the extracted page dict or None.
+        Links resolve against base_url (the URL after redirects), default url.
+        """
+        return self._executor.submit(_parse_job, url, body, charset, base_url)
+
+    def imap(self, jobs):
+        """
+        Parses (url, body, charset) or (url, body, charset, base_url) jobs,
+        yielding (url, page) in input order while keeping at most
+        max_pending pages in flight.
+        """
+        window = deque()
+        for job in jobs:
+            window.append((job[0], self._executor.submit(_parse_job, *job)))
+            if len(window) >= self.max_pending:
+                url, future = window.popleft()
+                yield url, future.result()
+        while window:
+            url, future = window.popleft()
+            yield url, future.result()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
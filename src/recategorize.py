@@ -0,0 +1,156 @@
+import os
+import sys
+import time
+from itertools import repeat
+from operator import itemgetter
+
+# Allow running as a script: python src/recategorize.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database import DatabaseManager, primary_category
+from src.scraper import KeywordManager, CATEGORIES
+
+# numpy turns the whole index into a few array operations; without it the
+# same sums run as plain Python loops, much slower
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Category columns in name order, so the first of tied categories wins as in primary_category
+COLUMNS = sorted(CATEGORIES)
+
+def keyword_columns(keywords, keywords_manager):
+    """{keyword: category column} for the keywords the dictionary files under one of CATEGORIES."""
+    column_of = {cat: i for i, cat in enumerate(COLUMNS)}
+    columns = {}
+    for keyword in keywords:
+        column = column_of.get(keywords_manager.get_category(keyword))
+        if column is not None:
+            columns[keyword] = column
+    return columns
+
+def count_matrix(rows, page_ids, columns):
+    """
+    Sums (web ID, name, count) rows into a pages x categories matrix, rows
+    in page_ids order (ascending), with columns mapping each name to its
+    category column; counts must be positive. With keyword rows this is the
+    sparse product of the pages x keywords count matrix and the keywords x
+    categories membership matrix. Names missing from columns count for nothing.
+    """
+    n, width = len(page_ids), len(COLUMNS)
+    if np is not None:
+        if not rows:
+            return np.zeros((n, width), dtype=np.int64)
+        # Column by column: unpacking millions of row tuples at once is the slow part
+        web_ids = np.fromiter(map(itemgetter(0), rows), dtype=np.int64, count=len(rows))
+        column = np.fromiter(map(columns.get, map(itemgetter(1), rows), repeat(-1)), dtype=np.int64, count=len(rows))
+        counts = np.fromiter(map(itemgetter(2), rows), dtype=np.int64, count=len(rows))
+        pages = np.array(page_ids, dtype=np.int64)
+        index = np.minimum(np.searchsorted(pages, web_ids), n - 1)
+        keep = (pages[index] == web_ids) & (column >= 0)
+        cells = np.bincount(index[keep] * width + column[keep], weights=counts[keep], minlength=n * width)
+        return cells.astype(np.int64).reshape(n, width)
+
+    dense = dict(zip(page_ids, range(n)))
+    matrix = [[0] * width for _ in range(n)]
+    for web_id, name, count in rows:
+        i, column = dense.get(web_id), columns.get(name)
+        if i is not None and column is not None:
+            matrix[i][column] += count
+    return matrix
+
+def changed_rows(new, old):
+    """Indexes of the rows that differ between two count matrices."""
+    if np is not None:
+        return np.flatnonzero((new != old).any(axis=1)).tolist()
+    return [i for i, (a, b) in enumerate(zip(new, old)) if a != b]
+
+def category_updates(matrix, page_ids, changed):
+    """
+    Category rows ((category, count, web ID)) and category_rank rows
+    ((category, score, web ID), scored as database.primary_category) for
+    the changed rows of matrix.
+    """
+    if np is not None:
+        sub = matrix[changed]
+        ids = np.array(page_ids, dtype=np.int64)[changed]
+        r, c = np.nonzero(sub)
+        rows = list(zip([COLUMNS[i] for i in c.tolist()], sub[r, c].tolist(), ids[r].tolist()))
+
+        total = sub.sum(axis=1)
+        best = sub.argmax(axis=1)
+        top = sub[np.arange(len(changed)), best].astype(np.float64)
+        ranked = np.flatnonzero(total > 0)
+        scores = top[ranked] * top[ranked] / total[ranked]
+        ranks = list(zip([COLUMNS[i] for i in best[ranked].tolist()], scores.tolist(), ids[ranked].tolist()))
+        return rows, ranks
+
+    rows, ranks = [], []
+    for i in changed:
+        counts = {COLUMNS[c]: n for c, n in enumerate(matrix[i]) if n}
+        rows.extend((category, n, page_ids[i]) for category, n in counts.items())
+        rank = primary_category(counts)
+        if rank:
+            ranks.append((rank[0], rank[1], page_ids[i]))
+    return rows, ranks
+
+def rescan_keywords(db, keywords_manager, batch_size=500):
+    """
+    Re-runs the keyword matcher over every page's stored text and replaces
+    its Keywords rows, so keywords added to the dictionary are picked up.
+    Pages without stored text keep their old counts. Returns pages scanned.
+    """
+    scanned = 0
+    keywords = {}
+    for web_id, body in db.iter_page_bodies(batch_size):
+        keywords[web_id], _ = keywords_manager.scan(body)
+        if len(keywords) >= batch_size:
+            db.replace_keywords(keywords)
+            scanned += len(keywords)
+            keywords = {}
+    if keywords:
+        db.replace_keywords(keywords)
+        scanned += len(keywords)
+    return scanned
+
+def recategorize(db=None, keywords_manager=None, rescan=False):
+    """
+    Recomputes every page's category counts and primary-category ranking
+    under the current keywords.json, from its stored keyword counts (or,
+    with rescan, from its stored text), and writes back only the pages
+    whose categories changed. Returns (pages, changed).
+    """
+    db = db or DatabaseManager()
+    keywords_manager = keywords_manager or KeywordManager()
+    start = time.perf_counter()
+    if rescan:
+        scanned = rescan_keywords(db, keywords_manager)
+        print(f"Rescanned the text of {scanned} pages in {time.perf_counter() - start:.2f}s.")
+        start = time.perf_counter()
+
+    page_ids = db.get_page_ids()
+    if not page_ids:
+        print("No pages to re-categorize.")
+        return 0, 0
+    keyword_rows = db.get_keyword_counts()
+    category_rows = db.get_category_counts()
+    loaded = time.perf_counter()
+
+    columns = keyword_columns({keyword for _, keyword, _ in keyword_rows}, keywords_manager)
+    new = count_matrix(keyword_rows, page_ids, columns)
+    old = count_matrix(category_rows, page_ids, {cat: i for i, cat in enumerate(COLUMNS)})
+    changed = changed_rows(new, old)
+    rows, ranks = category_updates(new, page_ids, changed)
+    scored = time.perf_counter()
+
+    if changed:
+        db.set_categories([page_ids[i] for i in changed], rows, ranks)
+
+    print(f"Re-categorized {len(page_ids)} pages from {len(keyword_rows)} keyword counts, "
+          f"{len(changed)} changed (load {loaded - start:.2f}s, score {scored - loaded:.2f}s, "
+          f"store {time.perf_counter() - scored:.2f}s).")
+    return len(page_ids), len(changed)
+
+if __name__ == "__main__":
+    recategorize(rescan='--rescan' in sys.argv[1:])
@@ -0,0 +1,83 @@
+import sys
+import os
+from datetime import datetime
+
+# Allow running as a script: python src/reindex.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.cache import ResponseCache
+from src.database import DatabaseManager
+from src.pipeline import ParsePool
+from src.scraper import Scraper, KeywordManager
+from src.simhash import SimHashIndex
+
+def reindex_from_cache(cache=None, db=None, keywords_manager=None, commit_every=500, processes=0,
+                       dedup_distance=3):
+    """
+    Rebuilds the index from cached responses without touching the network,
+    e.g. after keywords.json or the parser changes. Pages already in the DB
+    are updated in place; cached pages missing from it are added, unless
+    the crawler recorded them as near-duplicates or they are one now
+    (within dedup_distance bits, as in the crawler; None to keep them all).
+    With processes > 0, parsing runs in that many worker processes while
+    this thread keeps writing. Returns the number of pages written.
+    """
+    if cache is None:
+        cache = ResponseCache()
+    db = db or DatabaseManager()
+    keywords_manager = keywords_manager or KeywordManager()
+
+    # 1. Wrap every cached 200 in a Scraper so its validators are kept
+    scrapers = {}
+    def jobs():
+        for url, response in cache.items():
+            if response.status != 200 or db.get_duplicate_of(url):
+                continue
+            scraper = Scraper(url, db=db, keywords_manager=keywords_manager)
+            scraper.load_response(response)
+            scrapers[url] = scraper
+            yield url, response.body, scraper.charset, scraper.base_url
+
+    # 2. Parse in this process or in a pool, in cache order
+    if processes:
+        pool = ParsePool(processes)
+        pages = pool.imap(jobs())
+    else:
+        pool = None
+        pages = ((url, scrapers[url].extract(body)) for url, body, charset, base_url in jobs())
+
+    # 3. Store on this thread only
+    simhash_index = None
+    if dedup_distance is not None:
+        simhash_index = SimHashIndex(dedup_distance)
+        for web_id, fingerprint in db.get_simhashes():
+            simhash_index.add(fingerprint, web_id)
+    written = duplicates = 0
+    try:
+        with db.batch(commit_every):
+            for url, page in pages:
+                scraper = scrapers.pop(url)
+                if not page:
+                    continue
+                page.update(scraper.fetch_info())
+                page['web_id'] = db.get_web_id(url)
+                # Only new rows are checked: indexed pages were already let in
+                if simhash_index is not None and page['simhash'] is not None and not page['web_id']:
+                    match = simhash_index.find(page['simhash'])
+                    if match is not None:
+                        db.add_duplicate(url, match[0], match[1], datetime.now())
+                        duplicates += 1
+                        continue
+                web_id = scraper.store(page)
+                if simhash_index is not None and page['simhash'] is not None and web_id:
+                    simhash_index.add(page['simhash'], web_id)
+                written += 1
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    print(f"Reindexed {written} pages from cache, skipped {duplicates} new near-duplicates.")
+    return written
+
+if __name__ == "__main__":
+    reindex_from_cache(processes=os.cpu_count() or 1)
@@ -1,213 +1,607 @@
+import codecs
+import hashlib
 import os
 import json
-import random
+import pickle
+import re
+import sqlite3
 import ssl
+import time
 import urllib.request as UR
+from html import unescape
 from datetime import datetime
 from src.database import DatabaseManager
+from src.fetcher import (CHUNK_SIZE, MAX_BODY_BYTES, MAX_FETCH_SECONDS, HTML_TYPES, header_charset, skip_reason,
+                         read_body)
+from src.matcher import KeywordMatcher, FORMAT_VERSION as MATCHER_FORMAT
+from src.simhash import simhash
+from src.urls import canonicalize
 
 # Dynamic Paths
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 KEYWORDS_PATH = os.path.join(BASE_DIR, 'data', 'keywords.json')
 
+# The 12 domains every page is scored against
+CATEGORIES = [
+    "Finance", "Health", "Science", "Technology",
+    "UK_Politics", "Military", "America", "History",
+    "Geography", "Literature", "Sport", "Politics"
+]
+
 class KeywordManager:
-    def __init__(self):
-        self.word_dict = {}
-        if os.path.exists(KEYWORDS_PATH):
-            with open(KEYWORDS_PATH, 'r') as f:
-                self.word_dict = json.load(f)
-        else:
+    """
+    Loads the keyword dictionary and its compiled matcher.
+    Both are built once per keywords.json version: kept in memory for the
+    process and pickled next to the JSON so later runs skip parsing it.
+    """
+    _cache = {}
+
+    def __init__(self, path=KEYWORDS_PATH):
+        self.word_dict, self.matcher = self._load(path)
+
+    @classmethod
+    def _load(cls, path):
+        if not os.path.exists(path):
             print("Warning: keywords.json not found in data folder.")
+            return {}, KeywordMatcher({})
+
+        stat = os.stat(path)
+        # The matcher's format is part of the key: a pickle from older code is stale too
+        version = (MATCHER_FORMAT, stat.st_mtime_ns, stat.st_size)
+        cached = cls._cache.get(path)
+        if cached and cached[0] == version:
+            return cached[1], cached[2]
+
+        pickle_path = os.path.splitext(path)[0] + '.pkl'
+        try:
+            with open(pickle_path, 'rb') as f:
+                pickled_version, word_dict, matcher = pickle.load(f)
+            if pickled_version != version:
+                raise ValueError("stale keyword cache")
+        except Exception:
+            # Missing, stale or unreadable (e.g. pickled by an incompatible version): rebuild it
+            with open(path, 'r') as f:
+                word_dict = json.load(f)
+            matcher = KeywordMatcher(word_dict)
+            try:
+                with open(pickle_path, 'wb') as f:
+                    pickle.dump((version, word_dict, matcher), f, protocol=pickle.HIGHEST_PROTOCOL)
+            except OSError as e:
+                print(f"Warning: could not cache keywords: {e}")
+
+        cls._cache[path] = (version, word_dict, matcher)
+        return word_dict, matcher
 
     def get_category(self, keyword):
         # Case-insensitive lookup
         return self.word_dict.get(keyword) or self.word_dict.get(keyword.capitalize())
 
+    def scan(self, text):
+        """Returns per-keyword and per-category counts for the text."""
+        return self.matcher.scan(text)
+
 class WebParser:
     """
     Custom Lexical Analysis to extract content from HTML 
     without external libraries like BeautifulSoup.
+
+    The document is tokenized in a single incremental pass: feed() accepts
+    str or bytes chunks as they arrive and returns the paragraph, heading
+    and link events completed by that chunk. Links are resolved against
+    base_url (or the page's <base href>) and canonicalized; anything that
+    isn't http(s) is dropped.
     """
-    def __init__(self, html_content):
-        self.html = html_content
+    TEXT_TAGS = {'p': 'paragraph', 'h1': 'heading', 'h2': 'heading', 'h3': 'heading',
+                 'h4': 'heading', 'h5': 'heading', 'h6': 'heading'}
+    LINK_TAGS = ('a', 'area')
+    BASE_TAG = 'base'
+    SKIP_TAGS = ('script', 'style', 'noscript', 'template')
+    BREAK_TAGS = ('br', 'li', 'td', 'div')
+    # Block-level tags that implicitly close an open <p> (as in the HTML spec), so
+    # a paragraph without </p> doesn't swallow the nav, lists and footer after it
+    P_CLOSERS = frozenset(('address', 'article', 'aside', 'blockquote', 'details', 'div', 'dl', 'fieldset',
+                           'figcaption', 'figure', 'footer', 'form', 'header', 'hgroup', 'hr', 'main', 'menu',
+                           'nav', 'ol', 'pre', 'section', 'table', 'ul'))
+
+    TAG_RE = re.compile(r'<(/?)([a-zA-Z][a-zA-Z0-9]*)([^>]*)>')
+    HREF_RE = re.compile(r'''\bhref\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))''', re.I)
+    META_CHARSET_RE = re.compile(rb'''<meta[^>]+charset\s*=\s*["']?([a-zA-Z0-9_-]+)''', re.I)
+    SPACE_RE = re.compile(r'\s+')
+    SNIFF_BYTES = 1024
+
+    def __init__(self, html_content=None, charset=None, base_url=None):
         self.paragraphs = []
         self.headings = []
         self.links = []
+        self.charset = charset
+        self.base_url = base_url
+
+        self._buffer = ''
+        self._decoder = None
+        self._head = b''
+        self._current = None     # (event kind, closing tag, text parts)
+        self._skip_close = None  # compiled regex for the end of a skipped tag
+        self._events = []
+
+        if html_content is not None:
+            self.feed(html_content)
+            self.close()
+
+    # --- Incremental API ---
+
+    def feed(self, chunk):
+        """Tokenizes the next chunk and returns the events it completed."""
+        if isinstance(chunk, bytes):
+            if self._decoder is None:
+                # Hold raw bytes until there is enough to sniff a <meta charset>
+                self._head += chunk
+                if not self.charset and len(self._head) < self.SNIFF_BYTES:
+                    return []
+                chunk, self._head = self._head, b''
+                self._start_decoder()
+            chunk = self._decoder.decode(chunk)
+        self._buffer += chunk
+        self._scan()
+        return self._take_events()
+
+    def close(self):
+        """Flushes the decoder and finishes any element left open."""
+        if self._head:
+            self._start_decoder()
+            self._buffer += self._decoder.decode(self._head)
+            self._head = b''
+        if self._decoder is not None:
+            self._buffer += self._decoder.decode(b'', final=True)
+        self._scan()
+        if self._skip_close is None and self._buffer and self._current:
+            self._current[2].append(self._buffer)
+        self._buffer = ''
+        self._finish_current()
+        return self._take_events()
+
+    def _take_events(self):
+        events, self._events = self._events, []
+        return events
+
+    # --- Tokenizer ---
+
+    def _scan(self):
+        buf = self._buffer
+        i = 0
+        n = len(buf)
+        while i < n:
+            # Inside <script>/<style>: jump straight to the closing tag
+            if self._skip_close is not None:
+                match = self._skip_close.search(buf, i)
+                if not match:
+                    # Keep only enough tail to spot a close tag split across chunks
+                    i = max(i, n - 16)
+                    break
+                self._skip_close = None
+                i = match.end()
+                continue
+
+            lt = buf.find('<', i)
+            if lt == -1:
+                self._add_text(buf[i:])
+                i = n
+                break
+            if lt > i:
+                self._add_text(buf[i:lt])
+                i = lt
+
+            if buf.startswith('<!--', lt):
+                end = buf.find('-->', lt + 4)
+                if end == -1:
+                    break
+                i = end + 3
+                continue
+
+            match = self.TAG_RE.match(buf, lt)
+            if match:
+                self._handle_tag(match.group(1) == '/', match.group(2).lower(), match.group(3))
+                i = match.end()
+                continue
+
+            gt = buf.find('>', lt)
+            if gt == -1:
+                # Incomplete tag at the end of this chunk
+                break
+            if buf[lt + 1:lt + 2] in ('!', '?'):
+                # Doctype / processing instruction
+                i = gt + 1
+            else:
+                # A stray '<' in text
+                self._add_text('<')
+                i = lt + 1
+
+        self._buffer = buf[i:]
+
+    def _handle_tag(self, closing, name, attrs):
+        if self._current and self._current[1] == 'p' and name in self.P_CLOSERS:
+            self._finish_current()
+        if closing:
+            if self._current and name == self._current[1]:
+                self._finish_current()
+            elif self._current and name in self.BREAK_TAGS:
+                self._current[2].append(' ')
+            return
+
+        if name in self.TEXT_TAGS:
+            self._finish_current()
+            self._current = (self.TEXT_TAGS[name], name, [])
+        elif name in self.LINK_TAGS:
+            href = self.HREF_RE.search(attrs)
+            if href:
+                link = canonicalize(self._href(href), self.base_url)
+                if link:
+                    self.links.append(link)
+                    self._events.append(('link', link))
+        elif name == self.BASE_TAG:
+            href = self.HREF_RE.search(attrs)
+            if href:
+                self.base_url = canonicalize(self._href(href), self.base_url) or self.base_url
+        elif name in self.SKIP_TAGS and not attrs.rstrip().endswith('/'):
+            self._skip_close = re.compile(r'</%s\s*>' % name, re.I)
+        elif self._current and name in self.BREAK_TAGS:
+            self._current[2].append(' ')
+
+    @staticmethod
+    def _href(match):
+        return unescape(match.group(1) or match.group(2) or match.group(3) or '').strip()
+
+    def _add_text(self, text):
+        if self._current:
+            self._current[2].append(text)
 
-    def _extract_tag_content(self, tag_start):
-        """Helper to extract content between <tag> and next <"""
-        results = []
-        j = 0
-        while j < len(self.html):
-            # Find start of tag, e.g. "<p"
-            if self.html[j:j+len(tag_start)] == tag_start:
-                # Find end of the opening tag ">"
-                tag_close_idx = self.html.find('>', j)
-                if tag_close_idx != -1:
-                    # Content starts after ">"
-                    content_start = tag_close_idx + 1
-                    # Content ends at the next "<"
-                    content_end = self.html.find('<', content_start)
-                    if content_end != -1:
-                        raw_text = self.html[content_start:content_end]
-                        clean_text = self._clean_text(raw_text)
-                        if clean_text:
-                            results.append(clean_text)
-                        j = content_end
-            j += 1
-        return results
+    def _finish_current(self):
+        if not self._current:
+            return
+        kind, _, parts = self._current
+        self._current = None
+        text = self._clean_text(''.join(parts))
+        if not text:
+            return
+        if kind == 'paragraph':
+            self.paragraphs.append(text)
+        else:
+            self.headings.append(text)
+        self._events.append((kind, text))
+
+    def _start_decoder(self):
+        charset = self.charset or self._sniff_charset(self._head) or 'utf-8'
+        try:
+            self._decoder = codecs.getincrementaldecoder(charset)(errors='replace')
+        except LookupError:
+            self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+    @classmethod
+    def _sniff_charset(cls, head):
+        match = cls.META_CHARSET_RE.search(head[:cls.SNIFF_BYTES])
+        return match.group(1).decode('ascii') if match else None
+
+    # --- Extraction API ---
 
     def extract_paragraphs(self):
-        self.paragraphs = self._extract_tag_content('<p')
         return self.paragraphs
 
     def extract_headings(self):
-        # Simplified to catch h1, h2, etc. logic could be expanded
-        self.headings = self._extract_tag_content('<h')
         return self.headings
 
     def extract_links(self):
-        j = 0
-        while j < len(self.html):
-            if self.html[j:j+4] == 'href':
-                # Find first quote
-                start_quote = self.html.find('"', j)
-                if start_quote != -1:
-                    # Find closing quote
-                    end_quote = self.html.find('"', start_quote + 1)
-                    if end_quote != -1:
-                        link = self.html[start_quote+1:end_quote]
-                        if link.startswith('http'):
-                            self.links.append(link)
-            j += 1
         return self.links
 
-    @staticmethod
-    def _clean_text(text):
-        """Decodes common HTML entities."""
-        return text.replace("&#x27;", "'").replace("&amp;", "&").replace('&quot;', '"').strip()
+    @classmethod
+    def _clean_text(cls, text):
+        """Decodes HTML entities and collapses whitespace."""
+        return cls.SPACE_RE.sub(' ', unescape(text)).strip()
+
+# Shared by every Scraper: building a context loads the CA store, which
+# costs more than fetching a small page
+_ssl_context = None
+
+def ssl_context():
+    """SSL context for the urllib fallback, created on first use."""
+    global _ssl_context
+    if _ssl_context is None:
+        # Bypass SSL verification for educational scraping
+        ctx = ssl.create_default_context()
+        ctx.check_hostname = False
+        ctx.verify_mode = ssl.CERT_NONE
+        _ssl_context = ctx
+    return _ssl_context
+
+def analyze_content(paragraphs, keywords_manager):
+    """
+    Counts keyword and category frequency and generates a summary.
+    """
+    full_text = " ".join(paragraphs)
+    stats, category_stats = keywords_manager.scan(full_text)
+
+    # Build summary (take first ~50 valid words)
+    summary_words = []
+    for word in full_text.split():
+        clean_word = word.strip('.,;()[]"')
+        if clean_word:
+            summary_words.append(clean_word)
+            if len(summary_words) == 50:
+                break
+
+    summary_text = " ".join(summary_words) + "..."
+    return stats, category_stats, summary_text
+
+def extract_page(url, html, charset=None, keywords_manager=None, parser=None, base_url=None):
+    """
+    Parses and analyzes one page body. Needs no network or DB, so it can
+    run in a worker process. Returns None when the page has no text content.
+    Links resolve against base_url, the URL the body was served from after
+    redirects (default url).
+    A parser already fed the body while it downloaded is just closed.
+    page['timings'] holds the seconds spent per stage, for metrics.
+    """
+    start = time.perf_counter()
+    if parser is None:
+        parser = WebParser(charset=charset, base_url=base_url or url)
+        # Feed bytes a chunk at a time so the whole body is never decoded at once
+        step = CHUNK_SIZE if isinstance(html, bytes) else len(html) or 1
+        for i in range(0, len(html), step):
+            parser.feed(html[i:i + step])
+    parser.close()
+    paragraphs = parser.extract_paragraphs()
+    headings = parser.extract_headings()
+    links = parser.extract_links()
+    parsed = time.perf_counter()
+
+    if not paragraphs:
+        return None
+
+    keyword_stats, category_stats, summary = analyze_content(paragraphs, keywords_manager or KeywordManager())
+    analyzed = time.perf_counter()
+    # Fingerprint for near-duplicate detection (None for very short pages)
+    fingerprint = simhash(" ".join(paragraphs))
+    return {
+        'url': url,
+        'paragraphs': paragraphs,
+        'headings': headings,
+        'links': links,
+        'keyword_stats': keyword_stats,
+        'category_stats': category_stats,
+        'summary': summary,
+        'simhash': fingerprint,
+        'timings': {'parse': parsed - start, 'analyze': analyzed - parsed,
+                    'simhash': time.perf_counter() - analyzed},
+    }
 
 class Scraper:
-    def __init__(self, url, recursive=False):
-        self.url = url
+    def __init__(self, url, recursive=False, db=None, keywords_manager=None, fetcher=None, fetch_state=None):
+        # Same address, same string: ?utm_ variants, fragments etc. collapse
+        self.url = canonicalize(url) or url
         self.recursive = recursive
-        self.db = DatabaseManager()
-        self.keywords_manager = KeywordManager()
-        
-        # Bypass SSL verification for educational scraping
-        self.ctx = ssl.create_default_context()
-        self.ctx.check_hostname = False
-        self.ctx.verify_mode = ssl.CERT_NONE
-
-    def generate_web_id(self):
-        """Generates a unique ID ensuring no collision in DB."""
-        while True:
-            web_id = str(random.randint(0, 10**15))
-            # Check if exists
-            exists = self.db.execute_read('SELECT webpage_ID FROM webpage WHERE webpage_ID=?', (web_id,))
-            if not exists:
-                return web_id
-
-    def fetch_html(self):
+        # Optional pooled, rate-limited fetch layer (see src/fetcher.py)
+        self.fetcher = fetcher
+        self.charset = None
+        # URL the body was served from after redirects; relative links resolve against it
+        self.base_url = self.url
+        # WebParser fed while the body streams in (fetch_html(stream=True))
+        self.parser = None
+        # Seconds spent tokenizing streamed chunks: parse time, not fetch time
+        self.parse_seconds = 0.0
+
+        # For re-crawls: (web_id, etag, last_modified, content_hash) of the stored copy
+        self.fetch_state = fetch_state
+        self.etag = None
+        self.last_modified = None
+        self.content_hash = None
+        self.not_modified = False
+        # Why the last fetch returned nothing, and whether trying again later could help
+        self.error = None
+        self.retryable = False
+        # Why the body wasn't downloaded (wrong content type, too large)
+        self.skipped = None
+        # Crawler shares one DB handle and keyword dictionary across pages
+        self.db = db or DatabaseManager()
+        self.keywords_manager = keywords_manager or KeywordManager()
+
+    def _conditional_headers(self):
+        headers = {}
+        if self.fetch_state:
+            _, etag, last_modified, _ = self.fetch_state
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+        return headers
+
+    def _finish_fetch(self, body):
+        """Hashes the body and flags it as unchanged if it matches the stored copy."""
+        self.content_hash = hashlib.sha1(body).hexdigest()
+        if self.fetch_state and self.fetch_state[3] == self.content_hash:
+            self.not_modified = True
+            self.parser = None
+            return None
+        return body
+
+    def _stream_chunk(self, chunk, headers, url):
+        start = time.perf_counter()
+        if self.parser is None:
+            self.base_url = url
+            self.parser = WebParser(charset=header_charset(headers), base_url=url)
+        self.parser.feed(chunk)
+        self.parse_seconds += time.perf_counter() - start
+
+    def _skip(self, reason):
+        print(f"Skipped {self.url}: {reason}")
+        self.skipped = reason
+        self.parser = None
+        return None
+
+    def load_response(self, response):
+        """
+        Takes the charset, validators and content hash from a fetched or
+        cached Response and returns its body (None if unchanged).
+        """
+        self.charset = response.charset
+        self.base_url = response.url
+        self.etag = response.headers.get('etag')
+        self.last_modified = response.headers.get('last-modified')
+        return self._finish_fetch(response.body)
+
+    def fetch_html(self, stream=False):
+        """
+        Returns the raw page body, or None on failure. On a re-crawl, also
+        returns None with not_modified set when the server answers 304 or
+        the body hashes the same as the stored copy. Non-HTML and oversized
+        responses return None with skipped set; bodies longer than
+        MAX_BODY_BYTES are cut off. With stream, the body is also fed to a
+        WebParser chunk by chunk as it downloads, for extract() to finish;
+        not on a re-crawl, where an unchanged page shouldn't be parsed at all.
+        """
+        on_chunk = self._stream_chunk if stream and not self.fetch_state else None
         try:
             print(f"Fetching: {self.url}")
+            if self.fetcher:
+                # A re-crawl must see the live page, not a cached copy
+                response = self.fetcher.fetch(self.url, headers=self._conditional_headers(), on_chunk=on_chunk,
+                                              refresh=self.fetch_state is not None)
+                if response is None:
+                    return None
+                if response.skipped:
+                    return self._skip(response.skipped)
+                if response.truncated:
+                    print(f"Truncated {self.url} at {len(response.body)} bytes")
+                self.etag = response.headers.get('etag')
+                self.last_modified = response.headers.get('last-modified')
+                if response.status == 304:
+                    self.not_modified = True
+                    return None
+                if response.status >= 400:
+                    print(f"Error scraping {self.url}: HTTP {response.status}")
+                    self.error = f"HTTP {response.status}"
+                    self.retryable = response.status >= 500 or response.status == 429
+                    return None
+                return self.load_response(response)
+
             # User-agent helps avoid some 403 errors
-            req = UR.Request(self.url, headers={'User-Agent': 'Mozilla/5.0'})
-            response = UR.urlopen(req, context=self.ctx)
-            return str(response.read())
+            headers = {'User-Agent': 'Mozilla/5.0'}
+            headers.update(self._conditional_headers())
+            req = UR.Request(self.url, headers=headers)
+            try:
+                response = UR.urlopen(req, context=ssl_context(), timeout=15)
+            except UR.HTTPError as e:
+                if e.code == 304:
+                    self.not_modified = True
+                    return None
+                raise
+            with response:
+                response_headers = {k.lower(): v for k, v in response.headers.items()}
+                final_url = response.geturl()
+                reason = skip_reason(response.status, response_headers, MAX_BODY_BYTES, HTML_TYPES)
+                if reason:
+                    return self._skip(reason)
+                self.etag = response_headers.get('etag')
+                self.last_modified = response_headers.get('last-modified')
+                self.charset = header_charset(response_headers)
+                self.base_url = final_url
+                body, truncated = read_body(response, response_headers.get('content-encoding'), MAX_BODY_BYTES,
+                                            time.monotonic() + MAX_FETCH_SECONDS,
+                                            on_chunk and (lambda chunk: on_chunk(chunk, response_headers, final_url)))
+            if truncated:
+                print(f"Truncated {self.url} at {len(body)} bytes")
+            return self._finish_fetch(body)
         except Exception as e:
             print(f"Error scraping {self.url}: {e}")
+            self.error = str(e) or type(e).__name__
+            self.retryable = not isinstance(e, UR.HTTPError) or e.code >= 500
+            self.parser = None
             return None
 
     def analyze_content(self, paragraphs):
         """
-        Counts keyword frequency and generates a summary.
+        Counts keyword and category frequency and generates a summary.
         """
-        stats = {}
-        summary_words = []
-        
-        full_text = " ".join(paragraphs)
-        words = full_text.split(" ")
-        
-        for word in words:
-            clean_word = word.strip().strip('.,;()[]"')
-            if not clean_word:
-                continue
-            
-            # Check if this word is in our dictionary
-            cat = self.keywords_manager.get_category(clean_word)
-            if cat:
-                # It's a keyword, count it
-                key = clean_word.capitalize()
-                stats[key] = stats.get(key, 0) + 1
-            
-            # Build summary (take first ~50 valid words)
-            if len(summary_words) < 50:
-                summary_words.append(clean_word)
-
-        summary_text = " ".join(summary_words) + "..."
-        return stats, summary_text
-
-    def run(self):
-        # 1. Check uniqueness
-        if self.db.check_link_exists(self.url):
-            print("URL already indexed.")
-            return
-
-        # 2. Fetch
-        html = self.fetch_html()
-        if not html:
-            return
+        return analyze_content(paragraphs, self.keywords_manager)
 
-        # 3. Parse
-        parser = WebParser(html)
-        paragraphs = parser.extract_paragraphs()
-        headings = parser.extract_headings()
-        links = parser.extract_links()
-
-        if not paragraphs:
-            print("No text content found.")
-            return
-
-        # 4. Analyze
-        web_id = self.generate_web_id()
-        keyword_stats, summary = self.analyze_content(paragraphs)
-        
-        # 5. Calculate Categories
-        # Initialize 12 categories
-        categories = {
-            "Finance": 0, "Health": 0, "Science": 0, "Technology": 0,
-            "UK_Politics": 0, "Military": 0, "America": 0, "History": 0,
-            "Geography": 0, "Literature": 0, "Sport": 0, "Politics": 0
+    def fetch_info(self):
+        """Validators and hash from the last fetch, merged into the page before storing."""
+        return {
+            'web_id': self.fetch_state[0] if self.fetch_state else None,
+            'etag': self.etag,
+            'last_modified': self.last_modified,
+            'content_hash': self.content_hash,
         }
 
-        for word, count in keyword_stats.items():
-            cat = self.keywords_manager.get_category(word)
-            if cat and cat in categories:
-                categories[cat] += count
-            
-            # Store keyword occurrence
-            self.db.add_keyword_record(word, count, web_id)
+    def extract(self, html):
+        """
+        Parses and analyzes fetched HTML without touching the DB.
+        Returns None when the page has no text content.
+        """
+        page = extract_page(self.url, html, self.charset, self.keywords_manager, self.parser, self.base_url)
+        self.parser = None
+        if page:
+            page['timings']['parse'] += self.parse_seconds
+            page.update(self.fetch_info())
+        return page
+
+    def store(self, page):
+        """
+        Writes an extracted page to the DB and returns its web ID.
+        Pages that are already indexed (re-crawls) are updated in place.
+        """
+        # Calculate Categories (only the ones the page matched)
+        categories = {cat: count for cat, count in page['category_stats'].items() if cat in CATEGORIES and count}
 
-        # 6. Store Data
         # Extract owner from URL (e.g. bbc.co.uk)
         try:
             owner = self.url.split('/')[2]
         except:
             owner = "Unknown"
 
-        self.db.add_metadata_record(self.url, owner, ";".join(headings[:5]), ";".join(paragraphs[:5]), datetime.now())
-        self.db.add_webpage_record(web_id, self.url, summary)
-        
-        for cat, count in categories.items():
-            self.db.add_category_record(cat, count, web_id)
+        headings, paragraphs = page['headings'], page['paragraphs']
+        fields = dict(headings_text="\n".join(headings), body_text="\n".join(paragraphs),
+                      etag=page['etag'], last_modified=page['last_modified'], content_hash=page['content_hash'],
+                      simhash=page['simhash'], links=page['links'])
+
+        if page['web_id']:
+            self.db.update_page(page['web_id'], self.url, page['summary'],
+                                ";".join(headings[:5]), ";".join(paragraphs[:5]), datetime.now(),
+                                page['keyword_stats'], categories, **fields)
+            print(f"Updated {self.url} (ID {page['web_id']})")
+            return page['web_id']
+
+        try:
+            web_id = self.db.add_page(self.url, page['summary'], owner,
+                                      ";".join(headings[:5]), ";".join(paragraphs[:5]), datetime.now(),
+                                      page['keyword_stats'], categories, **fields)
+        except sqlite3.IntegrityError:
+            print("URL already indexed.")
+            return self.db.get_web_id(self.url)
 
         print(f"Successfully indexed {self.url} with ID {web_id}")
+        return web_id
 
-        # 7. Recursive Crawl
+    def run(self):
+        # Recursive crawls are handled by the frontier-based engine
         if self.recursive:
-            print(f"Found {len(links)} links. Crawling first 5...")
-            for link in links[:5]:
-                # Recursive call
-                crawler = Scraper(link, recursive=False)
-                crawler.run()
\ No newline at end of file
+            from src.crawler import Crawler
+            Crawler(self.url, max_depth=1, max_pages=6, db=self.db,
+                    keywords_manager=self.keywords_manager).run()
+            return
+
+        # 1. Check uniqueness
+        if self.db.check_link_exists(self.url) or self.db.get_duplicate_of(self.url):
+            print("URL already indexed.")
+            return
+
+        # 2. Fetch
+        html = self.fetch_html(stream=True)
+        if not html:
+            return
+
+        # 3. Parse & Analyze
+        page = self.extract(html)
+        if not page:
+            print("No text content found.")
+            return
+
+        # 4. Store Data
+        self.store(page)
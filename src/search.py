@@ -0,0 +1,40 @@
+import re
+from src.database import DatabaseManager
+
+class SearchEngine:
+    """
+    Keyword search over the full-text page index.
+    A query is plain words and "quoted phrases", all of which must match;
+    a trailing * turns a word into a prefix search (e.g. financ*).
+    Results are ranked with BM25 and paged.
+    """
+    TERM_RE = re.compile(r'"([^"]*)"|(\S+)')
+    WORD_RE = re.compile(r'\w+')
+
+    def __init__(self, db=None):
+        self.db = db or DatabaseManager()
+
+    @classmethod
+    def build_match(cls, query):
+        """
+        Translates a user query into an FTS5 MATCH expression.
+        Every token is quoted, so user input can never be parsed as FTS5
+        syntax (AND, NEAR, column filters, ...).
+        """
+        parts = []
+        for phrase, word in cls.TERM_RE.findall(query):
+            tokens = cls.WORD_RE.findall(phrase or word)
+            if not tokens:
+                continue
+            term = '"' + ' '.join(tokens) + '"'
+            if word.endswith('*'):
+                term += '*'
+            parts.append(term)
+        return ' AND '.join(parts)
+
+    def search(self, query, page=1, per_page=10):
+        """Returns up to per_page (url, summary, score) rows for a 1-based page."""
+        match = self.build_match(query)
+        if not match:
+            return []
+        return self.db.search_pages(match, limit=per_page, offset=(page - 1) * per_page)
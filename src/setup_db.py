@@ -1,30 +1,243 @@
 import sqlite3
 import os
+import sys
+import zlib
+
+# Allow running as a script: python src/setup_db.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.simhash import simhash
+
+# zlib level for stored page text (see _migrate_v7)
+TEXT_COMPRESSION = 6
 
 # Set path to data folder
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DB_PATH = os.path.join(BASE_DIR, 'data', 'linksurfer.db')
 
-def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+# --- Schema versions ---
+# The version lives in SQLite's PRAGMA user_version. Version 0 is the
+# original schema (no keys or indexes, random TEXT IDs); MIGRATIONS[n]
+# upgrades a database from version n to n + 1.
 
+def _create_v0(c):
     # Create Tables based on your original schema
-    c.execute('''CREATE TABLE IF NOT EXISTS Metadata 
+    c.execute('''CREATE TABLE IF NOT EXISTS Metadata
                  (url TEXT, owner TEXT, heading TEXT, paragraph TEXT, date TEXT)''')
-    
-    c.execute('''CREATE TABLE IF NOT EXISTS webpage 
+
+    c.execute('''CREATE TABLE IF NOT EXISTS webpage
                  (webpage_ID TEXT, url TEXT, summary TEXT)''')
-    
-    c.execute('''CREATE TABLE IF NOT EXISTS Category 
+
+    c.execute('''CREATE TABLE IF NOT EXISTS Category
                  (category TEXT, category_count INTEGER, webpage_ID TEXT)''')
-    
-    c.execute('''CREATE TABLE IF NOT EXISTS Keywords 
+
+    c.execute('''CREATE TABLE IF NOT EXISTS Keywords
                  (keyword TEXT, keyword_count INTEGER, webpage_ID TEXT)''')
 
-    conn.commit()
-    conn.close()
-    print(f"Database initialized at {DB_PATH}")
+def _migrate_v1(c):
+    """Integer autoincrement IDs, UNIQUE urls and covering indexes."""
+    for table in ('Metadata', 'webpage', 'Category', 'Keywords'):
+        c.execute(f'ALTER TABLE {table} RENAME TO {table}_v0')
+
+    c.execute('''CREATE TABLE webpage
+                 (webpage_ID INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT NOT NULL UNIQUE, summary TEXT)''')
+    c.execute('''CREATE TABLE Metadata
+                 (url TEXT NOT NULL UNIQUE, owner TEXT, heading TEXT, paragraph TEXT, date TEXT)''')
+    c.execute('''CREATE TABLE Category
+                 (category TEXT NOT NULL, category_count INTEGER, webpage_ID INTEGER NOT NULL)''')
+    c.execute('''CREATE TABLE Keywords
+                 (keyword TEXT NOT NULL, keyword_count INTEGER, webpage_ID INTEGER NOT NULL)''')
+
+    # Old databases can hold the same url more than once; keep the first copy
+    c.execute('''INSERT INTO webpage (url, summary)
+                 SELECT url, summary FROM webpage_v0
+                 WHERE rowid IN (SELECT MIN(rowid) FROM webpage_v0 WHERE url IS NOT NULL GROUP BY url)
+                 ORDER BY rowid''')
+    c.execute('''CREATE TEMP TABLE id_map AS
+                 SELECT o.webpage_ID AS old_id, n.webpage_ID AS new_id
+                 FROM webpage_v0 o JOIN webpage n ON n.url = o.url
+                 WHERE o.rowid IN (SELECT MIN(rowid) FROM webpage_v0 GROUP BY url)''')
+    c.execute('CREATE INDEX temp.id_map_old ON id_map (old_id)')
+
+    c.execute('''INSERT INTO Keywords (keyword, keyword_count, webpage_ID)
+                 SELECT k.keyword, k.keyword_count, m.new_id
+                 FROM Keywords_v0 k JOIN id_map m ON m.old_id = k.webpage_ID
+                 WHERE k.keyword IS NOT NULL''')
+    c.execute('''INSERT INTO Category (category, category_count, webpage_ID)
+                 SELECT cat.category, cat.category_count, m.new_id
+                 FROM Category_v0 cat JOIN id_map m ON m.old_id = cat.webpage_ID
+                 WHERE cat.category IS NOT NULL''')
+    c.execute('''INSERT INTO Metadata (url, owner, heading, paragraph, date)
+                 SELECT url, owner, heading, paragraph, date FROM Metadata_v0
+                 WHERE rowid IN (SELECT MIN(rowid) FROM Metadata_v0 WHERE url IS NOT NULL GROUP BY url)''')
+
+    c.execute('DROP TABLE id_map')
+    for table in ('Metadata', 'webpage', 'Category', 'Keywords'):
+        c.execute(f'DROP TABLE {table}_v0')
+
+    # Covering indexes for the per-page and per-category lookups
+    c.execute('CREATE INDEX idx_keywords_page ON Keywords (webpage_ID, keyword_count DESC, keyword)')
+    c.execute('CREATE INDEX idx_category_page ON Category (webpage_ID, category_count DESC, category)')
+    c.execute('CREATE INDEX idx_category_rank ON Category (category, category_count DESC, webpage_ID)')
+    c.execute('CREATE INDEX idx_metadata_date ON Metadata (date)')
+
+def _migrate_v2(c):
+    """Full-text index over page headings and text, keyed by webpage_ID."""
+    c.execute('''CREATE VIRTUAL TABLE page_fts USING fts5
+                 (headings, body, tokenize='porter unicode61 remove_diacritics 2')''')
+
+    # Older pages only kept their first headings/paragraphs in Metadata
+    c.execute('''INSERT INTO page_fts (rowid, headings, body)
+                 SELECT w.webpage_ID, REPLACE(COALESCE(m.heading, ''), ';', ' '),
+                        REPLACE(COALESCE(m.paragraph, w.summary, ''), ';', ' ')
+                 FROM webpage w LEFT JOIN Metadata m ON m.url = w.url''')
+
+def _migrate_v3(c):
+    """HTTP validators and a content hash per page for incremental re-crawls."""
+    for column in ('etag TEXT', 'last_modified TEXT', 'content_hash TEXT', 'fetched_at TEXT'):
+        c.execute(f'ALTER TABLE webpage ADD COLUMN {column}')
+    c.execute('''UPDATE webpage SET fetched_at =
+                 (SELECT m.date FROM Metadata m WHERE m.url = webpage.url)''')
+    c.execute('CREATE INDEX idx_webpage_fetched ON webpage (fetched_at)')
+
+def _migrate_v4(c):
+    """Crawl jobs and their frontier, checkpointed so a crawl can resume."""
+    c.execute('''CREATE TABLE crawl_job
+                 (job_ID INTEGER PRIMARY KEY AUTOINCREMENT, seeds TEXT NOT NULL, max_depth INTEGER,
+                  max_pages INTEGER, refresh INTEGER NOT NULL DEFAULT 0, status TEXT NOT NULL,
+                  fetched INTEGER NOT NULL DEFAULT 0, indexed INTEGER NOT NULL DEFAULT 0,
+                  errors INTEGER NOT NULL DEFAULT 0, unchanged INTEGER NOT NULL DEFAULT 0,
+                  started_at TEXT, updated_at TEXT)''')
+    # status: queued, done, skipped (already indexed), failed (out of retries) or duplicate
+    c.execute('''CREATE TABLE crawl_frontier
+                 (seq INTEGER PRIMARY KEY, job_ID INTEGER NOT NULL, url TEXT NOT NULL,
+                  depth INTEGER NOT NULL, retries INTEGER NOT NULL DEFAULT 0,
+                  status TEXT NOT NULL DEFAULT 'queued', UNIQUE (job_ID, url))''')
+    c.execute('''CREATE TABLE crawl_host
+                 (job_ID INTEGER NOT NULL, host TEXT NOT NULL, next_allowed REAL, delay REAL,
+                  PRIMARY KEY (job_ID, host)) WITHOUT ROWID''')
+    c.execute('CREATE INDEX idx_crawl_job_status ON crawl_job (status)')
+
+def _migrate_v5(c):
+    """SimHash fingerprints per page and a record of URLs skipped as near-duplicates."""
+    c.execute('ALTER TABLE webpage ADD COLUMN simhash INTEGER')
+    c.execute('''CREATE TABLE duplicate
+                 (url TEXT PRIMARY KEY, webpage_ID INTEGER NOT NULL, distance INTEGER, date TEXT)''')
+    c.execute('ALTER TABLE crawl_job ADD COLUMN duplicates INTEGER NOT NULL DEFAULT 0')
+
+    # Fingerprint the pages already indexed from their stored text
+    rows = c.execute('SELECT rowid, body FROM page_fts').fetchall()
+    c.executemany('UPDATE webpage SET simhash=? WHERE webpage_ID=?',
+                  [(simhash(body or ''), rowid) for rowid, body in rows])
+
+def _migrate_v6(c):
+    """Drops zero-count Category rows and adds a precomputed primary-category ranking."""
+    c.execute('DELETE FROM Category WHERE category_count IS NULL OR category_count <= 0')
+    # One row per page: its strongest category and a score (see database.primary_category)
+    c.execute('''CREATE TABLE category_rank
+                 (webpage_ID INTEGER PRIMARY KEY, category TEXT NOT NULL, score REAL NOT NULL)''')
+    c.execute('CREATE INDEX idx_category_rank_score ON category_rank (category, score DESC, webpage_ID)')
+
+    c.execute('''INSERT INTO category_rank (webpage_ID, category, score)
+                 SELECT webpage_ID, category, 1.0 * category_count * category_count / total
+                 FROM (
+                     SELECT webpage_ID, category, category_count,
+                            SUM(category_count) OVER (PARTITION BY webpage_ID) AS total,
+                            ROW_NUMBER() OVER (PARTITION BY webpage_ID
+                                               ORDER BY category_count DESC, category) AS position
+                     FROM Category
+                 )
+                 WHERE position = 1''')
+
+def _migrate_v7(c):
+    """
+    Full page text moves to page_text as zlib blobs, and page_fts becomes
+    contentless: the index still answers MATCH and bm25, but no longer
+    keeps its own uncompressed copy of every page.
+    """
+    c.execute('''CREATE TABLE page_text
+                 (webpage_ID INTEGER PRIMARY KEY, headings BLOB, body BLOB)''')
+    c.execute('ALTER TABLE page_fts RENAME TO page_fts_v6')
+    c.execute('''CREATE VIRTUAL TABLE page_fts USING fts5
+                 (headings, body, content='', tokenize='porter unicode61 remove_diacritics 2')''')
+
+    rows = c.connection.execute('SELECT rowid, headings, body FROM page_fts_v6')
+    while True:
+        chunk = rows.fetchmany(1000)
+        if not chunk:
+            break
+        c.executemany('INSERT INTO page_text (webpage_ID, headings, body) VALUES (?, ?, ?)',
+                      [(rowid, zlib.compress((headings or '').encode('utf-8'), TEXT_COMPRESSION),
+                        zlib.compress((body or '').encode('utf-8'), TEXT_COMPRESSION))
+                       for rowid, headings, body in chunk])
+        c.executemany('INSERT INTO page_fts (rowid, headings, body) VALUES (?, ?, ?)',
+                      [(rowid, headings or '', body or '') for rowid, headings, body in chunk])
+    c.execute('DROP TABLE page_fts_v6')
+
+def _migrate_v8(c):
+    """Outbound links per page and a link-analysis (PageRank) score blended into category ranking."""
+    # Every link target gets a small integer ID, indexed or not
+    c.execute('''CREATE TABLE link_url
+                 (url_ID INTEGER PRIMARY KEY, url TEXT NOT NULL UNIQUE)''')
+    # One row per page: its distinct target url_IDs packed as int32s (see database.pack_ids)
+    c.execute('''CREATE TABLE link
+                 (source_ID INTEGER PRIMARY KEY, targets BLOB NOT NULL)''')
+    # pagerank sums to 1 over all pages; authority is its percentile (0-1)
+    c.execute('ALTER TABLE webpage ADD COLUMN pagerank REAL')
+    c.execute('ALTER TABLE webpage ADD COLUMN authority REAL')
+
+    # category_rank orders by blended: score boosted by authority (equal to score until ranked)
+    c.execute('ALTER TABLE category_rank ADD COLUMN blended REAL')
+    c.execute('UPDATE category_rank SET blended = score')
+    c.execute('DROP INDEX idx_category_rank_score')
+    c.execute('CREATE INDEX idx_category_rank_blended ON category_rank (category, blended DESC, webpage_ID)')
+
+MIGRATIONS = [_migrate_v1, _migrate_v2, _migrate_v3, _migrate_v4, _migrate_v5, _migrate_v6, _migrate_v7,
+              _migrate_v8]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+def migrate(db_path=DB_PATH):
+    """
+    Creates or upgrades the database in place to SCHEMA_VERSION.
+    Each migration runs in its own transaction; a database that is already
+    current is only read. Returns the final version.
+    """
+    # Waits out a crawl's open transaction instead of failing at once
+    conn = sqlite3.connect(db_path, isolation_level=None, timeout=30)
+    try:
+        # Up to date is the common case: check without taking the write lock,
+        # so opening the database never waits on (or blocks) a running crawl
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        if version == SCHEMA_VERSION:
+            return version
+        while True:
+            c = conn.cursor()
+            # Take the write lock and read the version again, so two processes
+            # starting together can't both run the same migration
+            c.execute('BEGIN IMMEDIATE')
+            try:
+                version = c.execute('PRAGMA user_version').fetchone()[0]
+                if version > SCHEMA_VERSION:
+                    raise RuntimeError(f"Database {db_path} has schema v{version}, "
+                                       f"newer than this code (v{SCHEMA_VERSION})")
+                if version == SCHEMA_VERSION:
+                    c.execute('COMMIT')
+                    return version
+
+                if version == 0:
+                    _create_v0(c)
+                MIGRATIONS[version](c)
+                c.execute(f'PRAGMA user_version = {version + 1}')
+                c.execute('COMMIT')
+            except Exception:
+                c.execute('ROLLBACK')
+                raise
+    finally:
+        conn.close()
+
+def init_db(db_path=DB_PATH):
+    version = migrate(db_path)
+    print(f"Database initialized at {db_path} (schema v{version})")
 
 if __name__ == "__main__":
-    init_db()
\ No newline at end of file
+    init_db()
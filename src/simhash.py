@@ -0,0 +1,87 @@
+import hashlib
+import re
+from collections import Counter
+
+BITS = 64
+MASK = (1 << BITS) - 1
+WORD_RE = re.compile(r'\w+')
+# Pages with fewer words than this get no fingerprint: too little text to compare
+MIN_WORDS = 20
+
+# Bit-sliced counting: every hash bit gets its own LANE-bit counter inside
+# one big integer, so a shingle is added with 8 table lookups instead of a
+# loop over all 64 bits. SPREAD[j][b] places byte value b at byte j.
+LANE = 32
+SPREAD = [[sum((b >> i & 1) << ((8 * j + i) * LANE) for i in range(8)) for b in range(256)]
+          for j in range(BITS // 8)]
+
+def _digest(shingle):
+    return hashlib.blake2b(shingle.encode('utf-8'), digest_size=BITS // 8).digest()
+
+def simhash(text, shingle_size=3):
+    """
+    64-bit SimHash of a text's word shingles, or None for very short texts.
+    Similar texts get fingerprints that differ in only a few bits. Returned
+    as a signed integer so it fits an SQLite INTEGER column as-is.
+    """
+    words = WORD_RE.findall(text.lower())
+    if len(words) < MIN_WORDS:
+        return None
+
+    shingles = Counter(' '.join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1))
+    counters = 0
+    for shingle, count in shingles.items():
+        spread = sum(SPREAD[j][b] for j, b in enumerate(_digest(shingle)))
+        counters += spread * count
+
+    # A bit is set when more than half the shingle weight has it set
+    total = sum(shingles.values())
+    lane_mask = (1 << LANE) - 1
+    fingerprint = 0
+    for bit in range(BITS):
+        if 2 * (counters >> (bit * LANE) & lane_mask) > total:
+            fingerprint |= 1 << bit
+    return fingerprint - (1 << BITS) if fingerprint >> (BITS - 1) else fingerprint
+
+def distance(a, b):
+    """Hamming distance between two fingerprints."""
+    return bin((a ^ b) & MASK).count('1')
+
+class SimHashIndex:
+    """
+    Finds stored fingerprints within max_distance bits of a new one.
+    Fingerprints are split into max_distance + 1 bands; two fingerprints
+    that close must agree exactly on at least one band, so a lookup only
+    compares against the few entries sharing a band value.
+    """
+    def __init__(self, max_distance=3):
+        self.max_distance = max_distance
+        self.bands = max_distance + 1
+        self.band_bits = -(-BITS // self.bands)
+        self._tables = [{} for _ in range(self.bands)]
+        self._size = 0
+
+    def _band_values(self, fingerprint):
+        band_mask = (1 << self.band_bits) - 1
+        for i in range(self.bands):
+            yield (fingerprint >> (i * self.band_bits)) & band_mask
+
+    def add(self, fingerprint, key):
+        for table, value in zip(self._tables, self._band_values(fingerprint)):
+            table.setdefault(value, []).append((fingerprint, key))
+        self._size += 1
+
+    def find(self, fingerprint, exclude=None):
+        """Returns (key, distance) of the closest near-duplicate, or None."""
+        best = None
+        for table, value in zip(self._tables, self._band_values(fingerprint)):
+            for other, key in table.get(value, ()):
+                if key == exclude:
+                    continue
+                d = distance(fingerprint, other)
+                if d <= self.max_distance and (best is None or d < best[1]):
+                    best = (key, d)
+        return best
+
+    def __len__(self):
+        return self._size
@@ -0,0 +1,69 @@
+import posixpath
+import re
+from urllib.parse import urljoin, urlsplit, urlunsplit, parse_qsl, urlencode, quote
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = {'gclid', 'dclid', 'fbclid', 'msclkid', 'yclid', 'igshid', 'mc_cid', 'mc_eid',
+                   '_ga', '_gl', 'ref_src', 'ocid', 'cmpid'}
+TRACKING_PREFIXES = ('utm_',)
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+ESCAPE_RE = re.compile(r'%[0-9a-fA-F]{2}')
+# Characters left as they are when re-quoting a path or query
+PATH_SAFE = "/%:@!$&'()*+,;=-._~"
+
+def _is_tracking(name):
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+def canonicalize(url, base=None):
+    """
+    Normalizes a link so every spelling of the same address compares equal.
+    Relative links are resolved against base. The scheme and host are
+    lowercased, default ports dropped, dot segments resolved, escapes
+    normalized, tracking parameters and the fragment removed, and the
+    remaining query sorted. Returns None for anything that isn't http(s).
+    """
+    url = url.strip()
+    if base:
+        url = urljoin(base, url)
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return None
+
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parts.hostname:
+        return None
+
+    host = parts.hostname.rstrip('.')
+    if ':' in host:
+        host = f"[{host}]"
+    if port and port != DEFAULT_PORTS[scheme]:
+        host = f"{host}:{port}"
+    if parts.username:
+        host = f"{parts.username}@{host}"
+
+    path = parts.path or '/'
+    if '/.' in path:
+        trailing = path.endswith(('/', '/.', '/..'))
+        path = posixpath.normpath(path)
+        if path.startswith('//'):
+            path = '/' + path.lstrip('/')
+        if trailing and path != '/':
+            path += '/'
+    path = quote(ESCAPE_RE.sub(lambda m: m.group(0).upper(), path), safe=PATH_SAFE)
+
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not _is_tracking(k)]
+    query = urlencode(sorted(query), quote_via=quote)
+
+    return urlunsplit((scheme, host, path, query, ''))
+
+def url_key(url):
+    """
+    Dedup key for a canonical URL: http and https, and paths with and
+    without a trailing slash, are treated as the same page.
+    """
+    parts = urlsplit(url)
+    return urlunsplit(('', parts.netloc, parts.path.rstrip('/') or '/', parts.query, ''))
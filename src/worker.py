@@ -0,0 +1,107 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from src.crawler import Crawler
+
+class TaskRunner:
+    """
+    Runs blocking work (lookups, DB reads, single-page scrapes) off the Tk thread.
+    Results are posted to a thread-safe queue that the UI drains from its
+    own thread with after() polling, so callbacks always run on Tk.
+    """
+    def __init__(self, max_workers=2):
+        self.queue = queue.Queue()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers)
+
+    def submit(self, fn, on_done=None, on_error=None):
+        def task():
+            try:
+                result = fn()
+            except Exception as e:
+                self.queue.put(('error', on_error, e))
+            else:
+                self.queue.put(('done', on_done, result))
+        return self._pool.submit(task)
+
+    def post(self, kind, *payload):
+        """Sends a message to the UI thread from any thread."""
+        self.queue.put((kind,) + payload)
+
+    def drain(self):
+        """Returns every message waiting in the queue without blocking."""
+        messages = []
+        while True:
+            try:
+                messages.append(self.queue.get_nowait())
+            except queue.Empty:
+                return messages
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+class CrawlJob:
+    """
+    A crawl running on its own thread with pause, resume and cancel.
+    Progress snapshots and the final stats are posted through a TaskRunner
+    as ('crawl_progress', stats) and ('crawl_done', stats).
+    With resume_job, continues that checkpointed crawl (True picks the most
+    recent unfinished one) instead of starting from seeds.
+    """
+    def __init__(self, runner, seeds, resume_job=None, **crawler_options):
+        self.runner = runner
+        self.seeds = seeds
+        self.resume_job = resume_job
+        self.crawler_options = crawler_options
+        self.cancel_event = threading.Event()
+        self.pause_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        crawler = None
+        try:
+            hooks = dict(progress=lambda stats: self.runner.post('crawl_progress', stats),
+                         cancel_event=self.cancel_event, pause_event=self.pause_event)
+            if self.resume_job:
+                job_id = None if self.resume_job is True else self.resume_job
+                crawler = Crawler.resume(job_id, **hooks, **self.crawler_options)
+                if crawler is None:
+                    raise ValueError("No unfinished crawl to resume.")
+            else:
+                crawler = Crawler(self.seeds, **hooks, **self.crawler_options)
+            crawler.run()
+        except Exception as e:
+            print(f"Crawl failed: {e}")
+            if crawler is None:
+                self.runner.post('error', None, e)
+                return
+            crawler.last_error = str(e)
+        finally:
+            if crawler is not None:
+                # A DB handle passed in belongs to the caller
+                if 'db' not in self.crawler_options:
+                    crawler.db.close()
+                self.runner.post('crawl_done', crawler.stats())
+
+    def join(self, timeout=None):
+        self._thread.join(timeout)
+
+    @property
+    def running(self):
+        return self._thread.is_alive()
+
+    @property
+    def paused(self):
+        return self.pause_event.is_set()
+
+    def pause(self):
+        self.pause_event.set()
+
+    def resume(self):
+        self.pause_event.clear()
+
+    def cancel(self):
+        self.cancel_event.set()
+        self.pause_event.clear()